@@ -0,0 +1,99 @@
+"""
+Adjacency graph
+---------------
+
+After surfaces have been matched, adjoining surfaces refer to each other in their `Outside_Boundary_Condition_Object`
+fields. The graph in this module collects those links along with the area shared by each pair of surfaces and each
+pair of zones, so that questions like "which zones touch this zone?" can be answered without scanning every surface.
+
+"""
+
+from typing import Dict, Iterable, List, Tuple  # noqa
+
+from eppy.bunch_subclass import EpBunch  # noqa
+
+from .polygons import Polygon3D
+
+
+class AdjacencyGraph(object):
+    """Surface-to-surface and zone-to-zone adjacency with shared areas.
+
+    Both `surfaces` and `zones` are dicts of dicts, mapping a name to the names of its neighbours and the area shared
+    with each neighbour, e.g. `graph.zones["Zone 1"] == {"Zone 2": 12.5}`. Surfaces in the same zone are adjacent to
+    each other in `surfaces`, but a zone is not adjacent to itself in `zones`.
+
+    :param pairs: Pairs of matched surfaces. Default : no pairs.
+
+    """
+
+    def __init__(self, pairs=()):
+        # type: (Iterable[Tuple[EpBunch, EpBunch]]) -> None
+        self.surfaces = {}  # type: Dict[str, Dict[str, float]]
+        self.zones = {}  # type: Dict[str, Dict[str, float]]
+        for surface, other in pairs:
+            self.add(surface, other)
+
+    def __repr__(self):
+        # type: () -> str
+        return "AdjacencyGraph(%i surfaces, %i zones)" % (
+            len(self.surfaces),
+            len(self.zones),
+        )
+
+    @classmethod
+    def from_surfaces(cls, surfaces):
+        # type: (Iterable[EpBunch]) -> AdjacencyGraph
+        """Build the graph from the boundary conditions of surfaces.
+
+        :param surfaces: Surfaces which have already been matched.
+        :returns: An adjacency graph.
+
+        """
+        surfaces = [
+            s for s in surfaces if str(s.key).upper() == "BUILDINGSURFACE:DETAILED"
+        ]
+        by_name = {s.Name.upper(): s for s in surfaces}
+        graph = cls()
+        for s in surfaces:
+            if str(s.Outside_Boundary_Condition).upper() != "SURFACE":
+                continue
+            other = by_name.get(str(s.Outside_Boundary_Condition_Object).upper())
+            if other is not None:
+                graph.add(s, other)
+        return graph
+
+    def add(self, surface, other):
+        # type: (EpBunch, EpBunch) -> None
+        """Record that two surfaces adjoin each other.
+
+        Pairs which are not both building surfaces, and pairs which have already been added, are ignored.
+
+        :param surface: The first surface.
+        :param other: The second surface.
+
+        """
+        keys = {str(surface.key).upper(), str(other.key).upper()}
+        if keys != {"BUILDINGSURFACE:DETAILED"}:
+            return
+        if other.Name in self.surfaces.get(surface.Name, {}):
+            return
+        area = float(Polygon3D(surface.coords).area)
+        self.surfaces.setdefault(surface.Name, {})[other.Name] = area
+        self.surfaces.setdefault(other.Name, {})[surface.Name] = area
+        zone, other_zone = surface.Zone_Name, other.Zone_Name
+        if zone == other_zone:
+            return
+        zones = self.zones.setdefault(zone, {})
+        zones[other_zone] = zones.get(other_zone, 0.0) + area
+        other_zones = self.zones.setdefault(other_zone, {})
+        other_zones[zone] = other_zones.get(zone, 0.0) + area
+
+    def neighbours(self, zone):
+        # type: (str) -> List[str]
+        """The zones which adjoin a zone.
+
+        :param zone: The zone name.
+        :returns: A sorted list of zone names.
+
+        """
+        return sorted(self.zones.get(zone, {}))
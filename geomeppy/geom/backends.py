@@ -0,0 +1,353 @@
+"""
+Clipping backends
+-----------------
+
+The clipping methods of `Clipper2D` and `Clipper3D` hand the actual clipping to a backend. Backends work on 2D polygons
+given as (n, 2) arrays of floats, and return 2D rings as lists of [x, y] points. Polygons in 3D are projected to 2D
+before they are passed to a backend, and the results are projected back again afterwards.
+
+Two backends are registered:
+
+- `pyclipper`, the default, which uses pyclipper, a wrapper for the C++ Clipper library. Each operation runs in a
+  clipper session which holds the subject and clip paths.
+- `shapely`, which uses the array functions of shapely 2, so that clipping one polygon against many polygons runs
+  over the whole array of clip polygons in a single call.
+
+The backend used can be changed with `set_backend`, or temporarily with `use_backend`, e.g.
+`with use_backend("shapely"): ...`.
+
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple  # noqa
+
+import numpy as np
+import pyclipper as pc
+import shapely
+
+INTERSECTION = "intersection"
+DIFFERENCE = "difference"
+UNION = "union"
+
+_backends = {}  # type: Dict[str, Any]
+_current = "pyclipper"
+
+
+def register_backend(backend):
+    # type: (Any) -> None
+    """Register a clipping backend, making it available by its name.
+
+    :param backend: An object with a `name`, and `session` and `intersect_many` methods as `PyclipperBackend`. The
+        sessions need `execute` and `reset` methods as `PyclipperSession`.
+
+    """
+    _backends[backend.name] = backend
+
+
+def get_backend(name=None):
+    # type: (Optional[str]) -> Any
+    """Get a clipping backend.
+
+    :param name: The name of the backend. Default : None, which gets the backend currently in use.
+    :returns: The backend.
+
+    """
+    if name is None:
+        name = _current
+    try:
+        return _backends[name]
+    except KeyError:
+        raise ValueError("Unknown clipping backend: %s" % name)
+
+
+def set_backend(name):
+    # type: (str) -> None
+    """Set the clipping backend to use.
+
+    :param name: The name of the backend.
+
+    """
+    global _current
+    get_backend(name)
+    _current = name
+
+
+@contextmanager
+def use_backend(name):
+    # type: (str) -> Iterator[Any]
+    """Temporarily use a different clipping backend.
+
+    :param name: The name of the backend.
+    :returns: The backend.
+    """
+    previous = _current
+    set_backend(name)
+    try:
+        yield get_backend(name)
+    finally:
+        set_backend(previous)
+
+
+class PyclipperBackend(object):
+    """Clip with pyclipper."""
+
+    name = "pyclipper"
+
+    def session(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> PyclipperSession
+        """Start a session for clipping a subject polygon by clip polygons.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+        :returns: A session.
+
+        """
+        return PyclipperSession(subject, clips)
+
+    def intersect_many(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> List[List[List[List[float]]]]
+        """Intersect a subject polygon with each of several clip polygons.
+
+        Clipper merges all the clip paths in a session, so the clip polygons are intersected with one at a time. A
+        single session is reused for all of them, and the subject is only scaled once. Clip polygons whose bounding
+        boxes do not touch the subject are skipped.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+        :returns: A list of rings for each clip polygon.
+
+        """
+        bounds = _bounds(subject)
+        session = self.session(subject, [])
+        results = []  # type: List[List[List[List[float]]]]
+        for clip in clips:
+            if not _bounds_touch(bounds, _bounds(clip)):
+                results.append([])
+                continue
+            session.set_clips([clip])
+            results.append(session.execute(INTERSECTION))
+        return results
+
+
+class PyclipperSession(object):
+    """A pyclipper session, holding a subject polygon and clip polygons scaled to clipper paths.
+
+    :param subject: The subject polygon.
+    :param clips: The clip polygons.
+
+    """
+
+    _clip_types = {
+        INTERSECTION: pc.CT_INTERSECTION,
+        DIFFERENCE: pc.CT_DIFFERENCE,
+        UNION: pc.CT_UNION,
+    }
+
+    def __init__(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> None
+        self._clipper = pc.Pyclipper()
+        self.reset(subject, clips)
+
+    def reset(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> None
+        """Replace the subject and clip polygons, reusing the session.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+
+        """
+        self._subject = pc.scale_to_clipper(subject.tolist())
+        self.set_clips(clips)
+
+    def set_clips(self, clips):
+        # type: (List[np.ndarray]) -> None
+        """Replace the clip polygons, keeping the same subject polygon.
+
+        :param clips: The clip polygons.
+
+        """
+        self._clipper.Clear()
+        self._clipper.AddPath(self._subject, poly_type=pc.PT_SUBJECT, closed=True)
+        if clips:
+            paths = [pc.scale_to_clipper(clip.tolist()) for clip in clips]
+            self._clipper.AddPaths(paths, pc.PT_CLIP, closed=True)
+
+    def execute(self, operation, tree=False):
+        # type: (str, bool) -> List[Any]
+        """Run a clipping operation.
+
+        :param operation: One of "intersection", "difference" or "union".
+        :param tree: Keep holes with the polygons they are in. Default : False.
+        :returns: A list of rings, or if `tree` is True a list of (exterior, holes) pairs.
+
+        """
+        clip_type = self._clip_types[operation]
+        if not tree:
+            paths = self._clipper.Execute(clip_type, pc.PFT_NONZERO, pc.PFT_NONZERO)
+            return [pc.scale_from_clipper(path) for path in paths]
+        polytree = self._clipper.Execute2(clip_type, pc.PFT_NONZERO, pc.PFT_NONZERO)
+        parts = []
+        nodes = list(polytree.Childs)
+        while nodes:
+            node = nodes.pop(0)
+            holes = [pc.scale_from_clipper(hole.Contour) for hole in node.Childs]
+            parts.append((pc.scale_from_clipper(node.Contour), holes))
+            for hole in node.Childs:
+                nodes.extend(hole.Childs)  # polygons inside the holes
+        return parts
+
+
+class ShapelyBackend(object):
+    """Clip with shapely 2 array functions."""
+
+    name = "shapely"
+
+    def session(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> ShapelySession
+        """Start a session for clipping a subject polygon by clip polygons.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+        :returns: A session.
+
+        """
+        return ShapelySession(subject, clips)
+
+    def intersect_many(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> List[List[List[List[float]]]]
+        """Intersect a subject polygon with each of several clip polygons in a single call.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+        :returns: A list of rings for each clip polygon.
+
+        """
+        if not clips:
+            return []
+        results = shapely.intersection(_polygons([subject])[0], _polygons(clips))
+        return [_rings(parts) for parts in map(_polygon_parts, results)]
+
+
+class ShapelySession(object):
+    """Shapely geometries for a subject polygon and the union of the clip polygons.
+
+    :param subject: The subject polygon.
+    :param clips: The clip polygons.
+
+    """
+
+    _operations = {
+        INTERSECTION: shapely.intersection,
+        DIFFERENCE: shapely.difference,
+        UNION: shapely.union,
+    }
+
+    def __init__(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> None
+        self.reset(subject, clips)
+
+    def reset(self, subject, clips):
+        # type: (np.ndarray, List[np.ndarray]) -> None
+        """Replace the subject and clip polygons.
+
+        :param subject: The subject polygon.
+        :param clips: The clip polygons.
+
+        """
+        self._subject = _polygons([subject])[0]
+        self._clip = shapely.union_all(_polygons(clips)) if clips else None
+
+    def execute(self, operation, tree=False):
+        # type: (str, bool) -> List[Any]
+        """Run a clipping operation.
+
+        :param operation: One of "intersection", "difference" or "union".
+        :param tree: Keep holes with the polygons they are in. Default : False.
+        :returns: A list of rings, or if `tree` is True a list of (exterior, holes) pairs.
+
+        """
+        if self._clip is None:
+            result = None if operation == INTERSECTION else self._subject
+        else:
+            result = self._operations[operation](self._subject, self._clip)
+        parts = _polygon_parts(result)
+        return _parts(parts) if tree else _rings(parts)
+
+
+def _polygons(rings):
+    # type: (List[np.ndarray]) -> np.ndarray
+    """Make an array of valid shapely polygons from 2D rings."""
+    indices = np.repeat(np.arange(len(rings)), [len(r) for r in rings])
+    polygons = shapely.polygons(
+        shapely.linearrings(np.concatenate(rings), indices=indices)
+    )
+    invalid = ~shapely.is_valid(polygons)
+    if invalid.any():
+        polygons[invalid] = shapely.make_valid(polygons[invalid])
+    return polygons
+
+
+def _polygon_parts(geometry):
+    # type: (Any) -> List[Any]
+    """The polygons with some area in a clipping result, without vertices in a straight line with their neighbours.
+
+    The polygons are sorted by the lower left corners of their bounding boxes, so the order does not depend on GEOS.
+    """
+    if geometry is None:
+        return []
+    parts = shapely.get_parts(geometry)
+    while (shapely.get_type_id(parts) == 7).any():  # unpack geometry collections
+        parts = shapely.get_parts(parts)
+    parts = parts[(shapely.get_type_id(parts) == 3) & (shapely.area(parts) > 0)]
+    bounds = shapely.bounds(parts)
+    parts = parts[np.lexsort((bounds[:, 1], bounds[:, 0]))]
+    return list(shapely.simplify(parts, 0))
+
+
+def _coords(ring):
+    # type: (Any) -> List[List[float]]
+    """The vertices of a closed shapely ring, without the repeated closing vertex."""
+    return shapely.get_coordinates(ring)[:-1].tolist()
+
+
+def _rings(parts):
+    # type: (List[Any]) -> List[List[List[float]]]
+    """The exteriors and holes of polygons as a flat list of rings."""
+    return [ring for exterior, holes in _parts(parts) for ring in [exterior] + holes]
+
+
+def _parts(parts):
+    # type: (List[Any]) -> List[Tuple[List[List[float]], List[List[List[float]]]]]
+    """The exterior and holes of each polygon."""
+    return [
+        (
+            _coords(shapely.get_exterior_ring(part)),
+            [
+                _coords(shapely.get_interior_ring(part, i))
+                for i in range(shapely.get_num_interior_rings(part))
+            ],
+        )
+        for part in parts
+    ]
+
+
+def _bounds(points):
+    # type: (np.ndarray) -> Tuple[float, float, float, float]
+    """The bounding box of a 2D polygon, as (min x, min y, max x, max y)."""
+    (xmin, ymin), (xmax, ymax) = points.min(axis=0), points.max(axis=0)
+    return xmin, ymin, xmax, ymax
+
+
+def _bounds_touch(bounds1, bounds2):
+    # type: (Tuple[float, ...], Tuple[float, ...]) -> bool
+    """Test if two bounding boxes from `_bounds` overlap or touch."""
+    return (
+        bounds1[0] <= bounds2[2]
+        and bounds2[0] <= bounds1[2]
+        and bounds1[1] <= bounds2[3]
+        and bounds2[1] <= bounds1[3]
+    )
+
+
+register_backend(PyclipperBackend())
+register_backend(ShapelyBackend())
@@ -0,0 +1,163 @@
+"""
+Batches of polygons
+-------------------
+
+Whole-model passes like finding the plane of every surface build a `Polygon3D` for each surface and compute its
+properties one at a time. A `PolygonBatch` holds the vertices of many polygons in a single flat array with offsets to
+the first vertex of each polygon, so that normals, plane distances, areas, centroids and bounding boxes can be computed
+for all of the polygons at once using `np.add.reduceat` and friends.
+
+"""
+
+from typing import Any, Iterable, Tuple  # noqa
+
+import numpy as np
+
+from .polygons import DEGENERATE_TOLERANCE
+
+if False:
+    from eppy.bunch_subclass import EpBunch  # noqa
+
+
+class PolygonBatch(object):
+    """Many 3D polygons stored as a ragged array.
+
+    :param polygons: Polygons or sequences of (x, y, z) vertices. Each polygon must have at least one vertex.
+
+    """
+
+    def __init__(self, polygons):
+        # type: (Iterable[Any]) -> None
+        arrays = [self._as_array(p) for p in polygons]
+        counts = np.array([len(a) for a in arrays], dtype=int)
+        if len(counts) and counts.min() == 0:
+            raise ValueError("Polygons in a batch must have at least one vertex.")
+        self.counts = counts
+        self.offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(int)
+        self.points = np.concatenate(arrays) if arrays else np.zeros((0, 3))
+
+    @classmethod
+    def from_surfaces(cls, surfaces):
+        # type: (Iterable[EpBunch]) -> PolygonBatch
+        """Create a batch from the coordinates of IDF surfaces.
+
+        :param surfaces: IDF surfaces.
+        :returns: A batch of polygons.
+
+        """
+        return cls(s.coords for s in surfaces)
+
+    @staticmethod
+    def _as_array(polygon):
+        # type: (Any) -> np.ndarray
+        if hasattr(polygon, "points_matrix"):
+            return np.asarray(polygon.points_matrix, dtype=float)
+        points = np.array([tuple(v) for v in polygon], dtype=float)
+        return points.reshape(len(points), 3)
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.counts)
+
+    def _next_points(self):
+        # type: () -> np.ndarray
+        """The vertex after each vertex, wrapping around at the end of each polygon."""
+        index = np.arange(len(self.points)) + 1
+        ends = self.offsets + self.counts - 1
+        index[ends] = self.offsets
+        return self.points[index]
+
+    def _previous_points(self):
+        # type: () -> np.ndarray
+        """The vertex before each vertex, wrapping around at the start of each polygon."""
+        index = np.arange(len(self.points)) - 1
+        index[self.offsets] = self.offsets + self.counts - 1
+        return self.points[index]
+
+    def _sum(self, values):
+        # type: (np.ndarray) -> np.ndarray
+        """Sum per-vertex values for each polygon."""
+        if not len(self):
+            return np.zeros((0,) + values.shape[1:])
+        return np.add.reduceat(values, self.offsets, axis=0)
+
+    def newell_vectors(self):
+        # type: () -> np.ndarray
+        """Unnormalised normal vectors from Newell's method.
+
+        The length of each vector is twice the area of the polygon.
+
+        :returns: An (n, 3) array.
+
+        """
+        curr = self.points
+        nxt = self._next_points()
+        terms = np.empty_like(curr)
+        terms[:, 0] = (curr[:, 1] - nxt[:, 1]) * (curr[:, 2] + nxt[:, 2])
+        terms[:, 1] = (curr[:, 2] - nxt[:, 2]) * (curr[:, 0] + nxt[:, 0])
+        terms[:, 2] = (curr[:, 0] - nxt[:, 0]) * (curr[:, 1] + nxt[:, 1])
+        return self._sum(terms)
+
+    def normals(self):
+        # type: () -> np.ndarray
+        """Unit normal vectors, as `Polygon3D.normal_vector`.
+
+        Degenerate polygons with no area have a normal vector of zeros.
+
+        :returns: An (n, 3) array.
+
+        """
+        vectors = self.newell_vectors()
+        lengths = np.linalg.norm(vectors, axis=1)
+        safe = np.where(lengths > 0, lengths, 1.0)
+        return vectors / safe[:, np.newaxis]
+
+    def distances(self):
+        # type: () -> np.ndarray
+        """Distances from the origin to the plane of each polygon, as `Polygon3D.distance`.
+
+        :returns: An (n,) array.
+
+        """
+        if not len(self):
+            return np.zeros(0)
+        return np.einsum("ij,ij->i", self.normals(), self.points[self.offsets])
+
+    def areas(self):
+        # type: () -> np.ndarray
+        """Areas of the polygons, as `polygon_area`.
+
+        :returns: An (n,) array.
+
+        """
+        areas = np.linalg.norm(self.newell_vectors(), axis=1) / 2
+        if not len(self):
+            return areas
+        prev = self._previous_points()
+        corners = np.cross(self.points - prev, self._next_points() - prev)
+        sizes = np.einsum("ij,ij->i", corners, corners)
+        straight = np.maximum.reduceat(sizes, self.offsets) < DEGENERATE_TOLERANCE**2
+        areas[straight | (self.counts < 3)] = 0.0
+        return areas
+
+    def centroids(self):
+        # type: () -> np.ndarray
+        """Mean of the vertices of each polygon, as `Polygon.centroid`.
+
+        :returns: An (n, 3) array.
+
+        """
+        return self._sum(self.points) / self.counts[:, np.newaxis]
+
+    def bounding_boxes(self):
+        # type: () -> Tuple[np.ndarray, np.ndarray]
+        """Axis-aligned bounding boxes of the polygons.
+
+        :returns: Two (n, 3) arrays of the minimum and maximum corners.
+
+        """
+        if not len(self):
+            return np.zeros((0, 3)), np.zeros((0, 3))
+        mins = np.minimum.reduceat(self.points, self.offsets, axis=0)
+        maxs = np.maximum.reduceat(self.points, self.offsets, axis=0)
+        return mins, maxs
@@ -2,19 +2,21 @@
 Perform clipping operations on Polygons
 ---------------------------------------
 
-PyClipper is used for clipping. It's a wrapper for the C++ version of the Clipper library.
+We implement a few clipping functions here as `.difference`, `.intersect`, and `.union` methods of the `Clipper2D` and
+`Clipper3D` classes. These are then used as mixins for the `Polygon2D` and `Polygon3D` classes. `.intersect_many` and
+`.difference_many` clip against several polygons at once.
 
-We implement a few of the functions of PyClipper here as `.difference`, `.intersect`, and `.union` methods of the
-`Clipper2D` and `Clipper3D` classes. These are then used as mixins for the `Polygon2D` and `Polygon3D` classes.
+The clipping itself is done by a backend from `geomeppy.geom.backends`, which by default uses PyClipper, a wrapper for
+the C++ version of the Clipper library.
 
 """
 
-from typing import List  # noqa
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union  # noqa
 
-import pyclipper as pc
+from .backends import DIFFERENCE, get_backend, INTERSECTION, UNION
 
 if False:
-    from .polygons import Polygon  # noqa
+    from .polygons import Polygon, PolygonWithHoles  # noqa
 from ..utilities import almostequal
 
 
@@ -29,12 +31,7 @@ class Clipper2D(object):
         :returns: A list of Polygons representing the difference.
 
         """
-        clipper = self._prepare_clipper(poly)
-        if not clipper:
-            return []
-        differences = clipper.Execute(pc.CT_DIFFERENCE, pc.PFT_NONZERO, pc.PFT_NONZERO)
-
-        return self._process(differences)
+        return self._clip(DIFFERENCE, poly)
 
     def intersect(self, poly):
         # type: (Polygon) -> List[Polygon]
@@ -44,14 +41,7 @@ class Clipper2D(object):
         :returns: False if no intersection, otherwise a list of Polygons representing each intersection.
 
         """
-        clipper = self._prepare_clipper(poly)
-        if not clipper:
-            return []
-        intersections = clipper.Execute(
-            pc.CT_INTERSECTION, pc.PFT_NONZERO, pc.PFT_NONZERO
-        )
-
-        return self._process(intersections)
+        return self._clip(INTERSECTION, poly)
 
     def union(self, poly):
         # type: (Polygon) -> List[Polygon]
@@ -61,38 +51,94 @@ class Clipper2D(object):
         :returns: A list of Polygons.
 
         """
-        clipper = self._prepare_clipper(poly)
-        if not clipper:
-            return []
-        unions = clipper.Execute(pc.CT_UNION, pc.PFT_NONZERO, pc.PFT_NONZERO)
+        return self._clip(UNION, poly)
+
+    def intersect_many(self, polys):
+        # type: (Sequence[Polygon]) -> List[Tuple[int, Polygon]]
+        """Intersect with each of several other polygons.
+
+        This polygon is projected for clipping once for all of the clip polygons, and the backend intersects it with
+        all of them together where it can.
 
-        return self._process(unions)
+        :param polys: The clip polygons.
+        :returns: A list of (index, polygon) pairs, where index is the position in `polys` of the clip polygon which
+            produced the intersection.
+
+        """
+        subject, clips = self._clipper_paths_many(polys)
+        results = get_backend().intersect_many(subject, [clip for _i, clip in clips])
+        intersections = []  # type: List[Tuple[int, Polygon]]
+        for (i, _clip), rings in zip(clips, results):
+            intersections.extend((i, poly) for poly in self._process(rings))
+        return intersections
+
+    def difference_many(self, polys):
+        # type: (Sequence[Polygon]) -> List[Union[Polygon, PolygonWithHoles]]
+        """Difference from several other polygons, in a single clipping session.
+
+        :param polys: The clip polygons.
+        :returns: A list of the parts of this polygon which are not in any of the clip polygons. These are not tagged
+            by clip polygon since each part may be bounded by several of them, and a part may be a `PolygonWithHoles`.
+
+        """
+        subject, clips = self._clipper_paths_many(polys)
+        session = get_backend().session(subject, [clip for _i, clip in clips])
+        return self._process_tree(session.execute(DIFFERENCE, tree=True))
 
-    def _prepare_clipper(self, poly):
-        """Prepare 2D polygons for clipping operations.
+    def overlay(self, poly):
+        # type: (Polygon) -> Overlay
+        """Overlay with another polygon, to find the intersection and both differences in a single clipper session.
+
+        :param poly: The other polygon.
+        :returns: An Overlay.
+
+        """
+        return Overlay(self, poly)
+
+    def _clip(self, operation, poly):
+        # type: (str, Polygon) -> List[Polygon]
+        """Run a clipping operation against another polygon.
+
+        :param operation: One of "intersection", "difference" or "union".
+        :param poly: The clip polygon.
+        :returns: A list of Polygons.
+
+        """
+        paths = self._clipper_paths(poly)
+        if not paths:
+            return []
+        session = get_backend().session(paths[0], [paths[1]])
+        return self._process(session.execute(operation))
+
+    def _clipper_paths(self, poly):
+        """Get 2D polygons as paths for clipping.
 
         :param poly: The clip polygon.
-        :returns: A Pyclipper object.
+        :returns: A tuple of (n, 2) arrays for this polygon and the clip polygon.
+
+        """
+        return self.points_matrix, poly.points_matrix
+
+    def _clipper_paths_many(self, polys):
+        """Get this polygon and several clip polygons as paths for clipping.
+
+        :param polys: The clip polygons.
+        :returns: The path for this polygon, and a list of (index, path) pairs for the clip polygons.
 
         """
-        s1 = pc.scale_to_clipper(self.vertices_list)
-        s2 = pc.scale_to_clipper(poly.vertices_list)
-        clipper = pc.Pyclipper()
-        clipper.AddPath(s1, poly_type=pc.PT_SUBJECT, closed=True)
-        clipper.AddPath(s2, poly_type=pc.PT_CLIP, closed=True)
-        return clipper
+        return self.points_matrix, [(i, p.points_matrix) for i, p in enumerate(polys)]
 
-    def _process(self, results):
+    def _process(self, results, source=None):
         """Process and return the results of a clipping operation.
 
         :param results: A list of lists of coordinates .
+        :param source: The polygon whose clipper paths were clipped. Default : None, for this polygon.
         :returns: A list of Polygon2D results of the clipping operation.
 
         """
         if not results:
             return []
-        scaled = [pc.scale_from_clipper(r) for r in results]
-        polys = [self.as_2d(r) for r in scaled]
+        polys = [self.as_2d(r) for r in results]
         processed = []
         for poly in polys:
             if almostequal(poly.normal_vector, self.normal_vector):
@@ -101,41 +147,77 @@ class Clipper2D(object):
                 processed.append(poly.invert_orientation())
         return processed
 
+    def _process_tree(self, parts, source=None):
+        # type: (List[Tuple[Any, List[Any]]], Optional[Clipper2D]) -> List[Union[Polygon, PolygonWithHoles]]
+        """Process and return the results of a clipping operation which keeps holes with their polygons.
+
+        :param parts: A list of (exterior, holes) pairs of lists of coordinates.
+        :param source: The polygon whose clipper paths were clipped. Default : None, for this polygon.
+        :returns: A list of polygons, with a PolygonWithHoles for each polygon which has holes in it.
+
+        """
+        from .polygons import PolygonWithHoles  # noqa
+
+        processed = []  # type: List[Union[Polygon, PolygonWithHoles]]
+        for exterior, holes in parts:
+            outer = self._process([exterior], source)[0]
+            inner = self._process(holes, source)
+            processed.append(PolygonWithHoles(outer, inner) if inner else outer)
+        return processed
+
 
 class Clipper3D(Clipper2D):
     """This class is used to add clipping functionality to the Polygon3D class."""
 
-    def _prepare_clipper(self, poly):
-        """Prepare 3D polygons for clipping operations.
+    def _clipper_paths(self, poly):
+        """Project 3D polygons to 2D in the plane frame of this polygon.
 
         :param poly: The clip polygon.
-        :returns: A Pyclipper object.
+        :returns: A tuple of paths for this polygon and the clip polygon, or None if they are not coplanar.
 
         """
         if not self.is_coplanar(poly):
-            return False
-        poly1 = self.project_to_2D()
-        poly2 = poly.project_to_2D()
+            return None
+        frame = self.frame
+        return frame.project_to_2D(self), frame.project_to_2D(poly)
+
+    def _clipper_paths_many(self, polys):
+        """Project this polygon and several clip polygons to 2D.
 
-        s1 = pc.scale_to_clipper(poly1.vertices_list)
-        s2 = pc.scale_to_clipper(poly2.vertices_list)
-        clipper = pc.Pyclipper()
-        clipper.AddPath(s1, poly_type=pc.PT_SUBJECT, closed=True)
-        clipper.AddPath(s2, poly_type=pc.PT_CLIP, closed=True)
+        The polygons are projected in the plane frame of this polygon. Clip polygons which are not coplanar with it
+        are left out.
 
-        return clipper
+        :param polys: The clip polygons.
+        :returns: The path for this polygon, and a list of (index, path) pairs for the coplanar clip polygons.
 
-    def _process(self, results):
+        """
+        frame = self.frame
+        subject = frame.project_to_2D(self)
+        clips = [
+            (i, frame.project_to_2D(p))
+            for i, p in enumerate(polys)
+            if self.is_coplanar(p)
+        ]
+        return subject, clips
+
+    def _process(self, results, source=None):
         """Process and return the results of a clipping operation.
 
+        The results are given the same orientation as this polygon. They are projected back to 3D in the plane frame
+        of this polygon, unless that projects along a different axis to the frame of the source polygon which they were
+        projected to 2D in. This can happen for opposite facing polygons in a plane at 45 degrees to two axes.
+
         :param results: A list of lists of coordinates .
+        :param source: The polygon whose clipper paths were clipped. Default : None, for this polygon.
         :returns: A list of Polygon3D results of the clipping operation.
 
         """
         if not results:
             return []
-        results = [pc.scale_from_clipper(r) for r in results]
-        polys = [self.as_2d(v).project_to_3D(self) for v in results]
+        frame = self.frame
+        if source is not None and source.frame.projection_axis != frame.projection_axis:
+            frame = source.frame
+        polys = [type(self)(frame.project_to_3D(v)) for v in results]
         processed = []
         for poly in polys:
             if almostequal(self.normal_vector, poly.normal_vector):
@@ -143,3 +225,76 @@ class Clipper3D(Clipper2D):
             else:
                 processed.append(poly.invert_orientation())
         return processed
+
+
+class Overlay(object):
+    """The intersection and differences of two polygons.
+
+    Both polygons are projected for clipping once, and each operation runs the first time it is needed. All of the
+    operations run in a single clipping session, which swaps the subject and clip polygons for the reverse operations.
+
+    :param poly1: The first polygon.
+    :param poly2: The second polygon.
+
+    """
+
+    def __init__(self, poly1, poly2):
+        # type: (Clipper2D, Clipper2D) -> None
+        self.poly1 = poly1
+        self.poly2 = poly2
+        self._paths = poly1._clipper_paths(poly2)
+        self._backend = get_backend()
+        self._session = None  # type: Any
+        self._subject = None  # type: Optional[int]
+        self._results = {}  # type: Dict[Tuple[str, int, bool], List]
+
+    def _execute(self, operation, subject=0, tree=False):
+        # type: (str, int, bool) -> List
+        """Run a clipping operation, with either the first or the second polygon as the subject.
+
+        The result is a list of rings, or a list of (exterior, holes) pairs if `tree` is True.
+        """
+        key = (operation, subject, tree)
+        if key not in self._results:
+            if not self._paths:
+                self._results[key] = []
+                return []
+            paths = self._paths[subject], [self._paths[1 - subject]]
+            if self._session is None:
+                self._session = self._backend.session(*paths)
+            elif self._subject != subject:
+                self._session.reset(*paths)
+            self._subject = subject
+            self._results[key] = self._session.execute(operation, tree=tree)
+        return self._results[key]
+
+    @property
+    def intersection(self):
+        # type: () -> List[Polygon]
+        """The intersection, in the plane and orientation of the first polygon."""
+        return self.poly1._process(self._execute(INTERSECTION))
+
+    @property
+    def reverse_intersection(self):
+        # type: () -> List[Polygon]
+        """The intersection, in the plane and orientation of the second polygon."""
+        return self.poly2._process(self._execute(INTERSECTION), self.poly1)
+
+    @property
+    def difference(self):
+        # type: () -> List[Union[Polygon, PolygonWithHoles]]
+        """The part of the first polygon which is not in the second polygon.
+
+        This is a `PolygonWithHoles` where the second polygon is inside the first.
+        """
+        return self.poly1._process_tree(self._execute(DIFFERENCE, tree=True))
+
+    @property
+    def reverse_difference(self):
+        # type: () -> List[Union[Polygon, PolygonWithHoles]]
+        """The part of the second polygon which is not in the first polygon.
+
+        This is a `PolygonWithHoles` where the first polygon is inside the second.
+        """
+        parts = self._execute(DIFFERENCE, subject=1, tree=True)
+        return self.poly2._process_tree(parts, self.poly1)
@@ -1,7 +1,7 @@
 """Core and perimeter zoning approach."""
 
-from itertools import product
 from geomeppy.geom.polygons import Polygon2D
+from geomeppy.geom.vectors import squared_distances
 
 
 def get_core(footprint, perim_depth=None):
@@ -13,15 +13,11 @@ def get_core(footprint, perim_depth=None):
 def get_perims(footprint, core):
     perims = []
     poly = Polygon2D(footprint)
-    for edge in poly.edges:
-        c1 = sorted(
-            product([edge.p1] * len(core), core),
-            key=lambda x: x[0].relative_distance(x[1]),
-        )[0][1]
-        c2 = sorted(
-            product([edge.p2] * len(core), core),
-            key=lambda x: x[0].relative_distance(x[1]),
-        )[0][1]
+    # the closest core vertex to each footprint vertex
+    closest = squared_distances(poly, core).argmin(axis=1)
+    for i, edge in enumerate(poly.edges):
+        c1 = core[int(closest[i])]
+        c2 = core[int(closest[(i + 1) % len(poly)])]
         perims.append(Polygon2D([c1, edge.p1, edge.p2, c2]))
     return perims
 
@@ -0,0 +1,137 @@
+"""
+Spatial indexes for surfaces
+----------------------------
+
+Intersecting every surface with every other surface is O(n²) in the number of surfaces. Only surfaces which are
+coplanar (in either orientation) and have overlapping bounding boxes can share any area though, so we use the indexes
+in this module to find those candidate pairs before doing any clipping.
+
+"""
+
+from collections import defaultdict
+from itertools import product
+from math import floor
+from typing import Dict, Iterable, List, Sequence, Tuple, Union  # noqa
+
+import numpy as np
+
+from .batch import PolygonBatch
+
+if False:
+    from .polygons import Polygon3D  # noqa
+
+
+class PlaneIndex(object):
+    """Hash planes so that planes which are equal within a tolerance can be found in constant time.
+
+    Planes are represented as `(nx, ny, nz, d)` where `n` is the unit normal vector and `d` is the distance from the
+    origin. Each plane is stored in a cell of a grid with a cell size of twice the tolerance. Any plane within the
+    tolerance of another plane is then either in the same cell or in the neighbouring cell on the nearer side in each
+    dimension, so a lookup only needs to check 16 cells, and planes either side of a cell boundary are not missed.
+
+    """
+
+    def __init__(self, tolerance):
+        # type: (float) -> None
+        self.tolerance = tolerance
+        self.cell_size = 2.0 * tolerance
+        self.planes = []  # type: List[Tuple[float, ...]]
+        self._cells = defaultdict(list)  # type: Dict[Tuple[int, ...], List[int]]
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.planes)
+
+    def add(self, plane):
+        # type: (Sequence[float]) -> int
+        """Add a plane to the index.
+
+        :param plane: A plane as `(nx, ny, nz, d)`.
+        :returns: The key of the plane in the index.
+
+        """
+        key = len(self.planes)
+        plane = tuple(float(c) for c in plane)
+        self.planes.append(plane)
+        cell = tuple(int(floor(c / self.cell_size)) for c in plane)
+        self._cells[cell].append(key)
+        return key
+
+    def query(self, plane, reverse=True):
+        # type: (Sequence[float], bool) -> List[int]
+        """Find all planes in the index which are equal to a plane within the tolerance.
+
+        :param plane: A plane as `(nx, ny, nz, d)`.
+        :param reverse: Also find planes which are equal to the plane in the opposite orientation. Default : True.
+        :returns: Sorted keys of the matching planes.
+
+        """
+        plane = tuple(float(c) for c in plane)
+        targets = [plane]
+        if reverse:
+            targets.append(tuple(-c for c in plane))
+        found = set()
+        for target in targets:
+            for cell in self._neighbouring_cells(target):
+                for key in self._cells.get(cell, ()):
+                    if self._is_close(self.planes[key], target):
+                        found.add(key)
+        return sorted(found)
+
+    def _is_close(self, plane1, plane2):
+        # type: (Tuple[float, ...], Tuple[float, ...]) -> bool
+        return all(abs(a - b) <= self.tolerance for a, b in zip(plane1, plane2))
+
+    def _neighbouring_cells(self, plane):
+        # type: (Tuple[float, ...]) -> Iterable[Tuple[int, ...]]
+        """The cells which may contain planes within the tolerance of a plane."""
+        options = []
+        for c in plane:
+            scaled = c / self.cell_size
+            base = int(floor(scaled))
+            other = base - 1 if scaled - base < 0.5 else base + 1
+            options.append((base, other))
+        return product(*options)
+
+
+class SurfaceIndex(object):
+    """Index polygons by plane and bounding box to find pairs which may intersect.
+
+    :param polygons: The polygons to index, as a `PolygonBatch` or anything a `PolygonBatch` can be made from.
+    :param tolerance: Tolerance used when comparing planes and bounding boxes. Default : 1e-4.
+
+    """
+
+    def __init__(self, polygons, tolerance=1e-4):
+        # type: (Union[PolygonBatch, Sequence[Polygon3D]], float) -> None
+        self.tolerance = tolerance
+        self.plane_index = PlaneIndex(tolerance)
+        if not isinstance(polygons, PolygonBatch):
+            polygons = PolygonBatch(polygons)
+        self.mins, self.maxs = polygons.bounding_boxes()
+        for normal, distance in zip(polygons.normals(), polygons.distances()):
+            self.plane_index.add(tuple(normal) + (distance,))
+
+    def candidate_pairs(self):
+        # type: () -> List[Tuple[int, int]]
+        """Pairs of polygons which are coplanar and have overlapping bounding boxes.
+
+        Coplanar includes polygons in the same plane but with opposite orientation.
+
+        :returns: A list of `(i, j)` index pairs with `i < j`, in the same order as `itertools.combinations`.
+
+        """
+        pairs = []  # type: List[Tuple[int, int]]
+        for i, plane in enumerate(self.plane_index.planes):
+            others = np.array(
+                [j for j in self.plane_index.query(plane) if j > i], dtype=int
+            )
+            if not len(others):
+                continue
+            overlapping = np.all(
+                (self.mins[others] <= self.maxs[i] + self.tolerance)
+                & (self.mins[i] <= self.maxs[others] + self.tolerance),
+                axis=1,
+            )
+            pairs.extend((i, int(j)) for j in others[overlapping])
+        return pairs
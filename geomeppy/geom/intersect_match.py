@@ -1,65 +1,471 @@
 """Intersect and match all surfaces in an IDF."""
 
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from itertools import product
+from math import floor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union  # noqa
 
+from eppy.bunch_subclass import EpBunch  # noqa
+
+from geomeppy.geom.backends import get_backend, set_backend
 from geomeppy.geom.surfaces import (
     get_adjacencies,
     getidfplanes,
-    set_coords,
-    set_matched_surfaces,
-    set_unmatched_surface,
+    matched_surface_fields,
+    normalize_surface_coords,
+    set_fields,
+    unmatched_surface_fields,
 )
-from geomeppy.utilities import almostequal
+from geomeppy.utilities import almostequal, tolerances
 
 if False:
     from ..idf import IDF  # noqa
 
+# lightweight copy of a surface which can be sent to worker processes
+SurfaceData = namedtuple("SurfaceData", ["key", "Name", "coords"])
+
+
+class ChangePlan(object):
+    """Changes to an IDF from intersecting and matching, which can be applied later or thrown away.
+
+    Surfaces which intersecting would only replace with an identical copy are left out of the plan, so an IDF which has
+    already been intersected and matched gives an empty plan.
+
+    :param splits: Mapping from `(key, name)` of surfaces to the coordinates of the new surfaces which replace them.
+        Keys are upper case, e.g. `BUILDINGSURFACE:DETAILED`.
+    :param boundary_conditions: Mapping from `(key, name)` of surfaces to the field values to set on them. The names
+        may be those of new surfaces from `splits`.
+
+    """
+
+    def __init__(self, splits=None, boundary_conditions=None):
+        # type: (Optional[Dict[Tuple[str, str], List[Any]]], Optional[Dict[Tuple[str, str], Dict[str, str]]]) -> None
+        self.splits = splits or {}
+        self.boundary_conditions = boundary_conditions or {}
+
+    def __repr__(self):
+        # type: () -> str
+        return "ChangePlan(%i splits, %i boundary conditions)" % (
+            len(self.splits),
+            len(self.boundary_conditions),
+        )
+
+    def __len__(self):
+        # type: () -> int
+        """The number of changes in the plan. An empty plan means the IDF does not need to change."""
+        return len(self.splits) + len(self.boundary_conditions)
+
+    def planned_surfaces(self, surfaces, ggr=None):
+        # type: (List[EpBunch], Optional[Any]) -> List[Union[EpBunch, PlannedSurface]]
+        """The surfaces there would be after applying the splits, in the order the IDF would hold them.
+
+        :param surfaces: The current surfaces.
+        :param ggr: Global geometry rules. Default : None.
+        :returns: Surfaces which are not split, and stand-ins for the new surfaces.
+        """
+        groups = {}  # type: Dict[str, Tuple[List[Any], List[Any]]]
+        for s in surfaces:
+            kept, added = groups.setdefault(str(s.key).upper(), ([], []))
+            new_surfaces = self.splits.get((str(s.key).upper(), s.Name))
+            if new_surfaces is None:
+                kept.append(s)
+                continue
+            for i, coords in enumerate(new_surfaces, 1):
+                coords = [tuple(v) for v in normalize_surface_coords(coords, ggr)]
+                added.append(PlannedSurface(s, "%s_%i" % (s.Name, i), coords))
+        return [s for kept, added in groups.values() for s in kept + added]
+
+    def apply(self, idf):
+        # type: (IDF) -> None
+        """Apply the changes to an IDF.
+
+        :param idf: The IDF which the plan was made from.
+        """
+        idf.replace_surfaces(self.splits)
+        lookups = {}  # type: Dict[str, Dict[str, EpBunch]]
+        for (key, name), fields in self.boundary_conditions.items():
+            if key.upper() not in lookups:
+                lookups[key.upper()] = {
+                    s.Name.upper(): s for s in reversed(idf.idfobjects[key.upper()])
+                }
+            set_fields(lookups[key.upper()][name.upper()], fields)
+        idf.clear_adjacency_graph()
+
+
+class PlannedSurface(object):
+    """Stand-in for a surface which would be created by applying the splits in a change plan.
+
+    Fields other than the name and coordinates are read from the surface which would be split.
+
+    :param surface: The surface which would be split.
+    :param name: Name of the new surface.
+    :param coords: Coordinates of the new surface.
+
+    """
+
+    def __init__(self, surface, name, coords):
+        # type: (EpBunch, str, List[Tuple[float, float, float]]) -> None
+        self._surface = surface
+        self.Name = name
+        self.coords = coords
+
+    def __getattr__(self, name):
+        # type: (str) -> Any
+        return getattr(self._surface, name)
+
+    def __repr__(self):
+        # type: () -> str
+        return "PlannedSurface(%r)" % self.Name
 
-def intersect_idf_surfaces(idf):
-    # type: (IDF) -> None
+
+def intersect_idf_surfaces(idf, workers=None, surfaces=None, plan_only=False):
+    # type: (IDF, Optional[int], Optional[List[EpBunch]], bool) -> Optional[ChangePlan]
     """Intersect all surfaces in an IDF.
 
+    Surfaces can only intersect other surfaces in the same plane, so the surfaces are first split into buckets of
+    coplanar surfaces and each bucket is intersected separately. The buckets are independent, so the clipping can be
+    shared between a pool of worker processes. The results are always applied to the IDF in the main process and in
+    the same order, so the output does not depend on the number of workers.
+
+    :param idf: The IDF.
+    :param workers: Number of worker processes to use. Default : None, which intersects in the current process.
+    :param surfaces: Only intersect these surfaces. Default : None, which intersects all surfaces in the IDF.
+    :param plan_only: Return the splits as a change plan instead of applying them to the IDF. Default : False.
+    :returns: A change plan if `plan_only` is True, else None.
+    """
+    if surfaces is None:
+        surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
+    buckets = [surface_data(bucket) for bucket in get_plane_buckets(surfaces)]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(vars(tolerances).copy(), get_backend().name),
+        ) as executor:
+            results = list(executor.map(intersect_surface_data, buckets))
+    else:
+        results = [intersect_surface_data(bucket) for bucket in buckets]
+    if plan_only:
+        # leave out planes where no surface would change, e.g. if already intersected
+        current = {(s.key, s.Name): s.coords for bucket in buckets for s in bucket}
+        splits = {
+            (key.upper(), name): new_surfaces
+            for result in results
+            if not all(is_unchanged(current[k], polys) for k, polys in result)
+            for (key, name), new_surfaces in result
+        }
+        return ChangePlan(splits=splits)
+    adjacencies = [entry for result in results for entry in result]
+    apply_adjacencies(idf, adjacencies)
+    return None
+
+
+def init_worker(tolerance_values, backend_name):
+    # type: (Dict[str, Any], str) -> None
+    """Set up a worker process to intersect with the same settings as the main process.
+
+    Worker processes which are started by spawning rather than forking do not inherit changes to the tolerances or
+    the clipping backend.
+
+    :param tolerance_values: The attributes of `tolerances` in the main process.
+    :param backend_name: The name of the clipping backend used in the main process.
+    """
+    for name, value in tolerance_values.items():
+        setattr(tolerances, name, value)
+    set_backend(backend_name)
+
+
+def intersect_plane_surfaces(idf, surfaces):
+    # type: (IDF, List[EpBunch]) -> None
+    """Intersect the surfaces in a single plane of an IDF.
+
     :param idf: The IDF.
+    :param surfaces: Surfaces in the plane, e.g. a bucket from `get_plane_buckets`.
+    """
+    adjacencies = intersect_surface_data(surface_data(surfaces))
+    apply_adjacencies(idf, adjacencies)
+
+
+def surface_data(surfaces):
+    # type: (List[EpBunch]) -> List[SurfaceData]
+    """Copy the data needed for intersection out of IDF surfaces.
+
+    :param surfaces: A list of surfaces.
+    :returns: A list of picklable surface records.
+    """
+    return [SurfaceData(s.key, s.Name, tuple(s.coords)) for s in surfaces]
+
+
+def intersect_surface_data(surfaces):
+    # type: (List[SurfaceData]) -> List[Tuple[Tuple[str, str], List[List[Tuple[float, float, float]]]]]
+    """Intersect a bucket of surfaces without touching the IDF.
+
+    This is run in worker processes so it takes and returns only plain data.
+
+    :param surfaces: Surface records from `surface_data`.
+    :returns: Pairs of (key, name) and the coordinates of the new surfaces which replace that surface.
     """
-    surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
-    try:
-        ggr = idf.idfobjects["GLOBALGEOMETRYRULES"][0]
-    except IndexError:
-        ggr = None
-    # get all the intersected surfaces
     adjacencies = get_adjacencies(surfaces)
-    for surface in adjacencies:
-        key, name = surface
-        new_surfaces = adjacencies[surface]
-        old_obj = idf.getobject(key.upper(), name)
-        for i, new_coords in enumerate(new_surfaces, 1):
-            new = idf.copyidfobject(old_obj)
-            new.Name = "%s_%i" % (name, i)
-            set_coords(new, new_coords, ggr)
-        idf.removeidfobject(old_obj)
-
-
-def match_idf_surfaces(idf):
-    # type: (IDF) -> None
+    return [
+        (surface, [poly.vertices_list for poly in polys])
+        for surface, polys in adjacencies.items()
+    ]
+
+
+def is_unchanged(coords, new_surfaces):
+    # type: (Sequence[Sequence[float]], List[List[Tuple[float, float, float]]]) -> bool
+    """Test if intersecting would replace a surface with a single surface with the same vertices.
+
+    :param coords: The vertices of the surface.
+    :param new_surfaces: The vertices of the new surfaces.
+    :returns: True if the surface would not change, else False.
+    """
+    if len(new_surfaces) != 1:
+        return False
+    new_coords = list(new_surfaces[0])
+    new_coords = [
+        c
+        for i, c in enumerate(new_coords)
+        if c != new_coords[(i + 1) % len(new_coords)]
+    ]
+    return vertex_key(new_coords) == vertex_key(coords)
+
+
+def apply_adjacencies(idf, adjacencies):
+    # type: (IDF, List[Tuple[Tuple[str, str], List[List[Tuple[float, float, float]]]]]) -> None
+    """Replace intersected surfaces in an IDF with their new surfaces.
+
+    All the replacements are made in one pass using `IDF.replace_surfaces`.
+
+    :param idf: The IDF.
+    :param adjacencies: Output from `intersect_surface_data`.
+    """
+    idf.replace_surfaces(dict(adjacencies))
+
+
+def get_changed_planes(surfaces, changed):
+    # type: (List[EpBunch], List[EpBunch]) -> List[EpBunch]
+    """Find the surfaces in planes which need to be intersected and matched again after some surfaces have changed.
+
+    This is every plane which holds a changed surface, or a surface whose boundary condition refers to a changed
+    surface, e.g. the old neighbour of a surface which has been moved away.
+
+    :param surfaces: List of all the surfaces.
+    :param changed: The surfaces which have changed.
+    :returns: All of the surfaces in the affected planes.
+    """
+    changed_ids = {id(s) for s in changed}
+    changed_names = {s.Name.upper() for s in changed}
+    selected = []
+    for bucket in get_plane_buckets(surfaces):
+        for s in bucket:
+            boundary_object = getattr(s, "Outside_Boundary_Condition_Object", "")
+            if id(s) in changed_ids or str(boundary_object).upper() in changed_names:
+                selected.extend(bucket)
+                break
+    return selected
+
+
+def get_plane_buckets(surfaces, tolerance=None):
+    # type: (List[EpBunch], Optional[float]) -> List[List[EpBunch]]
+    """Partition surfaces into buckets of coplanar surfaces.
+
+    Each bucket holds the surfaces in one plane from `getidfplanes` together with the surfaces in the same plane but
+    facing the opposite way. Surfaces keep their original order within each bucket.
+
+    :param surfaces: List of all the surfaces.
+    :param tolerance: Tolerance for treating planes as the same plane. Default : None, see `getidfplanes`.
+    :returns: A list of buckets of surfaces.
+    """
+    order = {id(s): i for i, s in enumerate(surfaces)}
+    planes = getidfplanes(surfaces, tolerance)
+    buckets = []
+    seen = set()
+    for distance in planes:
+        for vector in planes[distance]:
+            if (distance, vector) in seen:
+                continue
+            seen.add((distance, vector))
+            bucket = list(planes[distance][vector])
+            opposite = planes.get(-distance, {}).get(-vector, [])
+            if opposite and (-distance, -vector) not in seen:
+                seen.add((-distance, -vector))
+                bucket.extend(opposite)
+            buckets.append(sorted(bucket, key=lambda s: order[id(s)]))
+    return buckets
+
+
+def match_idf_surfaces(
+    idf,  # type: IDF
+    surfaces=None,  # type: Optional[List[EpBunch]]
+    fallback=True,  # type: bool
+    tolerance=None,  # type: Optional[float]
+    plan_only=False,  # type: bool
+):
+    # type: (...) -> Union[List[Tuple[EpBunch, EpBunch]], ChangePlan]
     """Match all surfaces in an IDF.
 
+    Two surfaces match when one has the same vertices as the other in reverse order, starting from any vertex. Matches
+    are found by looking up a key for each surface's vertices in a dict built from the reversed vertices of the
+    surfaces in the opposing plane.
+
     :param idf: The IDF.
+    :param surfaces: Only match these surfaces. Default : None, which matches all surfaces in the IDF.
+    :param fallback: Also match surfaces which were not matched by key to surfaces in the opposing plane with vertices
+        which are equal within tolerance but were rounded to different keys, using `near_miss_matches`. Default : True.
+    :param tolerance: Tolerance for treating planes as the same plane. Default : None, see `getidfplanes`.
+    :param plan_only: Return the boundary conditions as a change plan instead of setting them. Default : False.
+    :returns: A change plan if `plan_only` is True, else the pairs of surfaces which were matched.
     """
-    surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
-    planes = getidfplanes(surfaces)
+    if surfaces is None:
+        surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
+    planes = getidfplanes(surfaces, tolerance)
+    changes = {}  # type: Dict[int, Tuple[EpBunch, Dict[str, str]]]
     matched = {}
+    lookups = {}  # type: Dict[Tuple[Any, Any], Dict[Tuple, List[EpBunch]]]
     for distance in planes:
         for vector in planes[distance]:
             surfaces = planes[distance][vector]
             for surface in surfaces:
-                set_unmatched_surface(surface, vector)
+                fields = unmatched_surface_fields(surface, vector)
+                add_changes(changes, surface, fields)
             matches = planes.get(-distance, {}).get(-vector, [])
-            for s, m in product(surfaces, matches):
-                if almostequal(s.coords, reversed(m.coords)):
+            if not matches:
+                continue
+            if (-distance, -vector) not in lookups:
+                lookups[(-distance, -vector)] = reversed_vertex_lookup(matches)
+            lookup = lookups[(-distance, -vector)]
+            unmatched = []
+            for s in surfaces:
+                found = [
+                    m
+                    for m in lookup.get(vertex_key(s.coords), [])
+                    if is_reversed(s.coords, m.coords)
+                ]
+                for m in found:
+                    matched[sorted_tuple(m, s)] = (m, s)
+                if not found:
+                    unmatched.append(s)
+            if fallback and unmatched:
+                for m, s in near_miss_matches(unmatched, matches):
                     matched[sorted_tuple(m, s)] = (m, s)
 
     for key in matched:
-        set_matched_surfaces(*matched[key])
+        for surface, fields in matched_surface_fields(*matched[key]):
+            add_changes(changes, surface, fields)
+    if plan_only:
+        plan = ChangePlan()
+        for surface, fields in changes.values():
+            changed = {
+                field: value
+                for field, value in fields.items()
+                if str(getattr(surface, field)) != value
+            }
+            if changed:
+                key = (str(surface.key).upper(), surface.Name)
+                plan.boundary_conditions[key] = changed
+        return plan
+    for surface, fields in changes.values():
+        set_fields(surface, fields)
+    return list(matched.values())
+
+
+def add_changes(changes, surface, fields):
+    # type: (Dict[int, Tuple[EpBunch, Dict[str, str]]], EpBunch, Dict[str, str]) -> None
+    """Collect field values to set on a surface, with later values replacing earlier ones."""
+    changes.setdefault(id(surface), (surface, {}))[1].update(fields)
+
+
+def reversed_vertex_lookup(surfaces):
+    # type: (List[EpBunch]) -> Dict[Tuple, List[EpBunch]]
+    """Map the keys of the reversed vertices of surfaces to the surfaces.
+
+    :param surfaces: A list of surfaces.
+    :returns: A dict of lists of surfaces, keyed by `vertex_key`.
+    """
+    lookup = {}  # type: Dict[Tuple, List[EpBunch]]
+    for m in surfaces:
+        lookup.setdefault(vertex_key(list(reversed(m.coords))), []).append(m)
+    return lookup
+
+
+def near_miss_matches(surfaces, opposing, places=None):
+    # type: (List[EpBunch], List[EpBunch], Optional[int]) -> List[Tuple[EpBunch, EpBunch]]
+    """Match surfaces to opposing surfaces with the same vertices reversed, within tolerance.
+
+    This finds the matches which `vertex_key` misses where vertices which are equal within tolerance are rounded to
+    different keys. The opposing surfaces are put in the cells of a grid by their centroids, with cells the size of
+    the tolerance, so each surface is only compared with the opposing surfaces in the same or neighbouring cells.
+
+    :param surfaces: The surfaces to match.
+    :param opposing: Surfaces in the opposing plane.
+    :param places: Number of decimal places to compare. Default : None, which uses `tolerances.places`.
+    :returns: A list of (opposing surface, surface) pairs.
+    """
+    if places is None:
+        places = tolerances.places
+    scale = 10**places
+
+    def cell(coords):
+        # type: (Sequence[Sequence[float]]) -> Tuple[int, ...]
+        n = len(coords) or 1
+        return tuple(int(floor(sum(c) / n * scale)) for c in zip(*coords))
+
+    grid = {}  # type: Dict[Tuple[int, ...], List[EpBunch]]
+    for m in opposing:
+        grid.setdefault(cell(m.coords), []).append(m)
+    found = []
+    for s in surfaces:
+        centre = cell(s.coords)
+        for offset in product((-1, 0, 1), repeat=len(centre)):
+            neighbour = tuple(c + o for c, o in zip(centre, offset))
+            for m in grid.get(neighbour, []):
+                if is_reversed(s.coords, m.coords, places):
+                    found.append((m, s))
+    return found
+
+
+def vertex_key(coords, places=None):
+    # type: (Sequence[Sequence[float]], Optional[int]) -> Tuple
+    """A hashable key for a sequence of vertices which does not depend on the starting vertex.
+
+    The coordinates are rounded to the given number of places and the sequence is rotated to start at the smallest
+    vertex.
+
+    :param coords: A sequence of vertices.
+    :param places: Number of decimal places to round to. Default : None, which uses `tolerances.places`.
+    :returns: A tuple of rounded vertices.
+    """
+    if places is None:
+        places = tolerances.places
+    scale = 10**places
+    rounded = [tuple(int(round(c * scale)) for c in v) for v in coords]
+    if not rounded:
+        return ()
+    smallest = min(rounded)
+    starts = [i for i, v in enumerate(rounded) if v == smallest]
+    return min(tuple(rounded[i:] + rounded[:i]) for i in starts)
+
+
+def is_reversed(coords1, coords2, places=None):
+    # type: (Sequence[Sequence[float]], Sequence[Sequence[float]], Optional[int]) -> bool
+    """Test if a sequence of vertices is another sequence of vertices reversed, starting from any vertex.
+
+    :param coords1: A sequence of vertices.
+    :param coords2: Another sequence of vertices.
+    :param places: Number of decimal places to compare. Default : None, which uses `tolerances.places`.
+    :returns: True if the vertices match, else False.
+    """
+    coords1 = list(coords1)
+    coords2 = list(reversed(coords2))
+    if len(coords1) != len(coords2):
+        return False
+    for i, v in enumerate(coords2):
+        if almostequal(coords1[0], v, places):
+            if almostequal(coords1, coords2[i:] + coords2[:i], places):
+                return True
+    return False
 
 
 def sorted_tuple(m, s):
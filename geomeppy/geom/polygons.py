@@ -1,22 +1,23 @@
 """Heavy lifting geometry for IDF surfaces."""
 
 from collections.abc import MutableSequence
-from itertools import product
-from math import atan2, pi
-from typing import Any, List, Optional, Tuple, Union  # noqa
+from math import atan2, pi, sqrt
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union  # noqa
 
-from eppy.geometry.surface import area
 from eppy.idf_msequence import Idf_MSequence  # noqa
 import numpy as np
 from shapely import wkt
 from shapely.geometry.polygon import Polygon as SPoly
 from shapely.geometry.polygon import orient
 
-from .clippers import Clipper2D, Clipper3D
-from .segments import Segment
+from .clippers import Clipper2D, Clipper3D, Overlay  # noqa
+from .segments import collinear_edges, Segment
 from .transformations import align_face, invert_align_face
-from .vectors import Vector2D, Vector3D
-from ..utilities import almostequal
+from .vectors import nearest_pairs, Vector2D, Vector3D
+from ..utilities import almostequal, tolerances
+
+# corners closer than this to a straight line are treated as collinear
+DEGENERATE_TOLERANCE = 1e-8
 
 
 class Polygon(Clipper2D, MutableSequence):
@@ -37,9 +38,57 @@ class Polygon(Clipper2D, MutableSequence):
     def __init__(self, vertices):
         # type: (Any) -> None
         super(Polygon, self).__init__()
-        self.vertices = [self.vector_class(*v) for v in vertices]
+        self._points = self._as_array(vertices)
+        self._cache = {}  # type: Dict[str, Any]
         self.as_2d = Polygon2D
 
+    def _as_array(self, vertices):
+        # type: (Any) -> np.ndarray
+        """Store vertices as a contiguous `(n, width)` array of floats.
+
+        The width is 3 for 3D polygons. For 2D polygons it is the length of the vertices passed in, since a 2D vector
+        can be created from an (x, y, z) tuple and keeps all three values.
+
+        """
+        if isinstance(vertices, np.ndarray) and vertices.ndim == 2:
+            rows = vertices  # type: Any
+            widths = {vertices.shape[1]}
+        else:
+            rows = [tuple(v) for v in vertices]
+            widths = {len(v) for v in rows}
+        width = 3 if self.n_dims == 3 else max(widths, default=self.n_dims)
+        if widths == {width}:
+            return np.array(rows, dtype=float).reshape(len(rows), width)
+        points = np.zeros((len(rows), width))
+        for i, v in enumerate(rows):
+            points[i, : len(v)] = v
+        return points
+
+    @property
+    def vertices(self):
+        # type: () -> List[Union[Vector2D, Vector3D]]
+        """The vertices of the polygon as a list of vectors."""
+        return [self.vector_class(*v) for v in self._points.tolist()]
+
+    @vertices.setter
+    def vertices(self, vertices):
+        # type: (Any) -> None
+        self._points = self._as_array(vertices)
+        self._cache.clear()
+
+    def _cached(self, key, compute):
+        # type: (str, Callable[[], Any]) -> Any
+        """Get a derived value from the cache, computing it if needed.
+
+        The cache is cleared whenever the vertices change.
+
+        """
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = compute()
+            return value
+
     def __repr__(self):
         # type: () -> str
         class_name = type(self).__name__
@@ -47,17 +96,37 @@ class Polygon(Clipper2D, MutableSequence):
 
     def __len__(self):
         # type: () -> int
-        return len(self.vertices)
+        return self._points.shape[0]
+
+    def __iter__(self):
+        # type: () -> Iterator[Any]
+        return (self.vector_class(*v) for v in self._points.tolist())
 
     def __delitem__(self, key):
-        del self.vertices[key]
+        self._points = np.delete(self._points, key, axis=0)
+        self._cache.clear()
 
     def __getitem__(self, key):
         # type: (Union[int, slice]) -> Any
-        return self.vertices[key]
+        if isinstance(key, slice):
+            return [self.vector_class(*v) for v in self._points[key].tolist()]
+        return self.vector_class(*self._points[key].tolist())
 
     def __setitem__(self, key, value):
-        self.vertices[key] = value
+        # type: (Union[int, slice], Any) -> None
+        if not isinstance(key, slice):
+            self._points[key] = self._as_rows([value])[0]
+        else:
+            rows = self._as_rows(value)
+            start, stop, step = key.indices(len(self))
+            if step == 1 and max(stop, start) - start != len(rows):
+                # the number of vertices changes
+                self._points = np.concatenate(
+                    (self._points[:start], rows, self._points[max(stop, start) :])
+                )
+            else:
+                self._points[key] = rows
+        self._cache.clear()
 
     def __add__(self, other):  # type: (Polygon) -> Union[None, Polygon]
         if len(self) == len(other) and hasattr(other[0], "__len__"):
@@ -82,15 +151,89 @@ class Polygon(Clipper2D, MutableSequence):
         return self.__class__(vertices)
 
     def insert(self, key, value):
-        self.vertices.insert(key, value)
+        # type: (int, Any) -> None
+        if key < 0:
+            key = max(len(self) + key, 0)
+        key = min(key, len(self))
+        rows = self._as_rows([value])
+        self._points = np.insert(self._points, key, rows, axis=0)
+        self._cache.clear()
+
+    def _as_rows(self, vertices):
+        # type: (Any) -> np.ndarray
+        """Convert vertices to rows of the same width as the stored vertices, for writing into them.
+
+        The stored vertices of a 2D polygon are widened with zeros if the new vertices are wider.
+
+        """
+        rows = self._as_array(vertices)
+        width = max(rows.shape[1], self._points.shape[1])
+        if self._points.shape[1] < width:
+            self._points = np.pad(
+                self._points, ((0, 0), (0, width - self._points.shape[1]))
+            )
+        if rows.shape[1] < width:
+            rows = np.pad(rows, ((0, 0), (0, width - rows.shape[1])))
+        return rows
+
+    def _compare(self, other, tolerance=None):
+        # type: (Any, Optional[float]) -> Optional[bool]
+        """Compare with another polygon without clipping where possible.
+
+        Polygons with different bounding boxes or areas are not equal, and polygons with the same vertices in the same
+        order, starting from any vertex, are equal.
+
+        :param other: The other polygon.
+        :param tolerance: Maximum difference in coordinates and areas. Default : None, which is as close as
+            `almostequal` allows at `tolerances.places`.
+        :returns: True or False, or None if the polygons need to be clipped to be sure.
+
+        """
+        if tolerance is None:
+            tolerance = 0.5 * 10.0**-tolerances.places
+        if not isinstance(other, Polygon):
+            return False
+        if self._same_vertices(other):
+            return True
+        points, other_points = self.points_matrix, other.points_matrix
+        if not len(points) or not len(other_points):
+            return None
+        if points.shape[1] != other_points.shape[1]:
+            return None  # e.g. a 2D and a 3D polygon
+        if (
+            np.abs(points.min(axis=0) - other_points.min(axis=0)).max() > tolerance
+            or np.abs(points.max(axis=0) - other_points.max(axis=0)).max() > tolerance
+            or abs(self.area - other.area) > tolerance
+        ):
+            return False
+        if len(points) == len(other_points):
+            starts = np.abs(other_points - points[0]).max(axis=1) <= tolerance
+            for start in np.flatnonzero(starts):
+                rotated = np.roll(other_points, -start, axis=0)
+                if np.abs(rotated - points).max() <= tolerance:
+                    return True
+        return None
+
+    def _same_vertices(self, other):
+        # type: (Any) -> bool
+        """Check if another polygon has exactly the same vertices, starting from the same vertex."""
+        if not isinstance(other, Polygon) or len(self) != len(other):
+            return False
+        width = min(self._points.shape[1], other._points.shape[1])
+        return bool(np.array_equal(self._points[:, :width], other._points[:, :width]))
 
     @property
     def area(self):
         # type: () -> np.float64
-        return area(self)
+        return self._cached("area", lambda: polygon_area(self.points_matrix))
 
     @property
     def bounding_box(self):
+        # type: () -> Polygon
+        bbox = self._cached("bounding_box", self._bounding_box)
+        return bbox.__class__(bbox.points_matrix)
+
+    def _bounding_box(self):
         # type: () -> Polygon
         aligned = align_face(self)
         top_left = Vector3D(min(aligned.xs), max(aligned.ys), max(aligned.zs))
@@ -108,7 +251,7 @@ class Polygon(Clipper2D, MutableSequence):
         :param join_style: The styles of joins between offset segments: 1 (round), 2 (mitre), and 3 (bevel).
 
         """
-        s_poly = SPoly(self.vertices)
+        s_poly = SPoly(self._points)
         core = orient(s_poly.buffer(distance=distance, join_style=join_style), sign=1.0)
         return Polygon2D(core.boundary.coords)
 
@@ -124,13 +267,28 @@ class Polygon(Clipper2D, MutableSequence):
     def edges(self):
         # type: () -> List[Segment]
         """A list of edges represented as Segment objects."""
-        vertices = self.vertices
+        vertices = self.vertices  # type: List[Any]
         edges = [
             Segment(vertices[i], vertices[(i + 1) % len(self)])
             for i in range(len(self))
         ]
         return edges
 
+    @property
+    def edges_array(self):
+        # type: () -> np.ndarray
+        """The edges as a read-only (n, 2, 3) array of start and end points. 2D polygons have z of zero."""
+        return self._cached("edges_array", self._edges_array)
+
+    def _edges_array(self):
+        # type: () -> np.ndarray
+        points = np.zeros((len(self), 3))
+        width = min(self.n_dims, self._points.shape[1])
+        points[:, :width] = self._points[:, :width]
+        edges = np.stack([points, np.roll(points, -1, axis=0)], axis=1)
+        edges.setflags(write=False)
+        return edges
+
     def invert_orientation(self):
         # type: () -> Polygon
         """Reverse the order of the vertices.
@@ -140,7 +298,7 @@ class Polygon(Clipper2D, MutableSequence):
         :returns: A polygon.
 
         """
-        return self.__class__(reversed(self.vertices))
+        return self.__class__(self._points[::-1])
 
     @property
     def is_convex(self):
@@ -151,15 +309,17 @@ class Polygon(Clipper2D, MutableSequence):
         # type: () -> np.ndarray
         """Matrix representing the points in a polygon.
 
+        This is a read-only view of the stored vertices, so no copy is made.
+
         Format::
-            [[x1, x2,... xn]
-            [y1, y2,... yn]
-            [z1, z2,... zn]  # all 0 for 2D polygon
+            [[x1, y1, z1]
+            [x2, y2, z2]
+            ...
+            [xn, yn, zn]]  # no z column for a 2D polygon
 
         """
-        points = np.zeros((len(self.vertices), self.n_dims))
-        for i, v in enumerate(self.vertices):
-            points[i, :] = v.as_array(dims=self.n_dims)
+        points = self._points[:, : self.n_dims]
+        points.flags.writeable = False
         return points
 
     @property
@@ -170,17 +330,17 @@ class Polygon(Clipper2D, MutableSequence):
         :returns: A list of tuples like [(x1, y1), (x2, y2),... (xn, yn)].
 
         """
-        return [pt.as_tuple(dims=self.n_dims) for pt in self.vertices]
+        return [tuple(pt) for pt in self.points_matrix.tolist()]
 
     @property
     def xs(self):
         # type: () -> List[float]
-        return [pt.x for pt in self.vertices]
+        return self._points[:, 0].tolist()
 
     @property
     def ys(self):
         # type: () -> List[float]
-        return [pt.y for pt in self.vertices]
+        return self._points[:, 1].tolist()
 
     @property
     def zs(self):
@@ -194,20 +354,23 @@ class Polygon2D(Polygon):
     vector_class = Vector2D
 
     def __eq__(self, other):
-        if self.__dict__ == other.__dict__:  # try the simple case first
+        compared = self._compare(other)  # try the simple cases first
+        if compared is not None:
+            return compared
+        # also cover same shape with different vertices
+        if self.difference(other):
+            return False
+        if almostequal(self.normal_vector, other.normal_vector):
             return True
-        else:  # also cover same shape in different rotation
-            if self.difference(other):
-                return False
-            if almostequal(self.normal_vector, other.normal_vector):
-                return True
         return False
 
     @property
     def normal_vector(self):
         # type: () -> Vector3D
-        as_3d = Polygon3D((v.x, v.y, 0) for v in self)
-        return as_3d.normal_vector
+        normal = self._cached(
+            "normal_vector", lambda: Polygon3D(self._points[:, :2]).normal_vector
+        )
+        return Vector3D(*normal)
 
     def project_to_3D(self, example3d):
         # type: (Polygon3D) -> Polygon3D
@@ -220,17 +383,15 @@ class Polygon2D(Polygon):
         :returns: A 3D polygon.
 
         """
-        points = self.points_matrix
         proj_axis = example3d.projection_axis
         a = example3d.distance
         v = example3d.normal_vector
-        projected_points = project_to_3D(points, proj_axis, a, v)
-        return Polygon3D(projected_points)
+        return Polygon3D(project_to_3D(self._points[:, :2], proj_axis, a, v))
 
     @property
     def zs(self):
         # type: () -> List[float]
-        return [0.0] * len(self.vertices)
+        return [0.0] * len(self)
 
 
 class Polygon3D(Clipper3D, Polygon):
@@ -240,18 +401,23 @@ class Polygon3D(Clipper3D, Polygon):
     vector_class = Vector3D
 
     def __eq__(self, other):
+        if not isinstance(other, Polygon3D):
+            return False
         # check they're in the same plane
         if not almostequal(self.normal_vector, other.normal_vector):
             return False
         if not almostequal(self.distance, other.distance):
             return False
+        compared = self._compare(other)
+        if compared is not None:
+            return compared
         # if they are in the same plane, check they completely overlap in 2D
         return self.project_to_2D() == other.project_to_2D()
 
     @property
     def zs(self):
         # type: () -> List[float]
-        return [pt.z for pt in self.vertices]
+        return self._points[:, 2].tolist()
 
     @property
     def normal_vector(self):
@@ -261,15 +427,19 @@ class Polygon3D(Clipper3D, Polygon):
         https://www.opengl.org/wiki/Calculating_a_Surface_Normal#Newell.27s_Method
 
         """
-        n = [0.0, 0.0, 0.0]
+        normal = self._cached("normal_vector", self._normal_vector)
+        return Vector3D(*normal)
 
-        for i, v_curr in enumerate(self.vertices):
-            v_next = self.vertices[(i + 1) % len(self.vertices)]
-            n[0] += (v_curr.y - v_next.y) * (v_curr.z + v_next.z)
-            n[1] += (v_curr.z - v_next.z) * (v_curr.x + v_next.x)
-            n[2] += (v_curr.x - v_next.x) * (v_curr.y + v_next.y)
+    def _normal_vector(self):
+        # type: () -> Vector3D
+        n = [0.0, 0.0, 0.0]
+        points = self._points.tolist()
+        for (x1, y1, z1), (x2, y2, z2) in zip(points, points[1:] + points[:1]):
+            n[0] += (y1 - y2) * (z1 + z2)
+            n[1] += (z1 - z2) * (x1 + x2)
+            n[2] += (x1 - x2) * (y1 + y2)
 
-        return Vector3D(*n).normalize()
+        return Vector3D(*n).set_length(1.0)
 
     @property
     def distance(self):
@@ -282,6 +452,10 @@ class Polygon3D(Clipper3D, Polygon):
         :returns: The distance from the origin to the polygon.
 
         """
+        return self._cached("distance", self._distance)
+
+    def _distance(self):
+        # type: () -> np.float64
         v = self.normal_vector
         pt = self.points_matrix[0]  # arbitrary point in the polygon
         d = np.dot(v, pt)
@@ -295,7 +469,12 @@ class Polygon3D(Clipper3D, Polygon):
         :returns: The axis index.
 
         """
-        proj_axis = max(range(3), key=lambda i: abs(self.normal_vector[i]))
+        return self._cached("projection_axis", self._projection_axis)
+
+    def _projection_axis(self):
+        # type: () -> int
+        normal = self.normal_vector
+        proj_axis = max(range(3), key=lambda i: abs(normal[i]))
         return proj_axis
 
     @property
@@ -318,7 +497,7 @@ class Polygon3D(Clipper3D, Polygon):
         :returns: True if vertices are ordered clockwise when observed from the given viewpoint.
 
         """
-        arbitrary_pt = self.vertices[0]
+        arbitrary_pt = self[0]
         v = arbitrary_pt - viewpoint
         n = self.normal_vector
         sign = np.dot(v, n)
@@ -359,9 +538,9 @@ class Polygon3D(Clipper3D, Polygon):
         """
         entry_direction = entry_direction.lower()
         if entry_direction == "clockwise":
-            inside = self.vertices[0] - self.normal_vector
+            inside = self[0] - self.normal_vector
         elif entry_direction == "counterclockwise":
-            inside = self.vertices[0] + self.normal_vector
+            inside = self[0] + self.normal_vector
         else:
             raise ValueError("invalid value for entry_direction '%s'" % entry_direction)
         return inside
@@ -389,6 +568,22 @@ class Polygon3D(Clipper3D, Polygon):
 
         return Polygon3D(new_vertices)
 
+    @property
+    def frame(self):
+        # type: () -> PlaneFrame
+        """The plane frame used to project the polygon to and from 2D.
+
+        This is a frame for the polygon's own plane, unless a frame shared with other polygons in the same plane has
+        been set, e.g. by `share_frames`. The frame is dropped if the vertices change.
+
+        """
+        return self._cached("frame", lambda: PlaneFrame.from_polygon(self))
+
+    @frame.setter
+    def frame(self, frame):
+        # type: (PlaneFrame) -> None
+        self._cache["frame"] = frame
+
     def project_to_2D(self):
         # type: () -> Polygon2D
         """Project the 3D polygon into 2D space.
@@ -401,10 +596,7 @@ class Polygon3D(Clipper3D, Polygon):
         :returns: A 2D polygon.
 
         """
-        points = self.points_matrix
-        projected_points = project_to_2D(points, self.projection_axis)
-
-        return Polygon2D([pt[:2] for pt in projected_points])
+        return Polygon2D(self.frame.project_to_2D(self))
 
     def normalize_coords(self, ggr):
         """Order points, respecting the global geometry rules
@@ -432,30 +624,194 @@ class Polygon3D(Clipper3D, Polygon):
         """
         poly = wkt.loads(wkt_poly)
         exterior = Polygon3D(poly.exterior.coords)
-        if poly.interiors:
-            # make the exterior into a geomeppy poly
-            for inner_ring in poly.interiors:
-                # make the interior into a geomeppy poly
-                interior = Polygon3D(inner_ring.coords)
-                # find the nearest points on the exterior and interior
-                links = list(product(interior, exterior))
-                links = sorted(links, key=lambda x: x[0].relative_distance(x[1]))
-                on_interior = links[0][0]
-                on_exterior = links[0][1]
-                # join them up
-                exterior = Polygon3D(
-                    exterior[exterior.index(on_exterior) :]
-                    + exterior[: exterior.index(on_exterior) + 1]
-                )
-                interior = Polygon3D(
-                    interior[interior.index(on_interior) :]
-                    + interior[: interior.index(on_interior) + 1]
-                )
-                exterior = Polygon3D(exterior[:] + interior[:])
+        if not poly.interiors:
+            return exterior
+        holes = [Polygon3D(inner_ring.coords) for inner_ring in poly.interiors]
+        return PolygonWithHoles(exterior, holes).keyhole()
+
+
+class PolygonWithHoles(object):
+    """A 3D polygon with holes in it.
+
+    EnergyPlus surfaces cannot have holes, so these are produced by clipping and kept with their holes until they are
+    about to be written to surfaces. They are then either broken up into polygons without holes with `break_up`, or
+    joined up into a single polygon with `keyhole`.
+
+    :param exterior: The outer boundary.
+    :param holes: The holes.
+
+    """
+
+    def __init__(self, exterior, holes):
+        # type: (Polygon3D, List[Polygon3D]) -> None
+        self.exterior = exterior
+        self.holes = list(holes)
+
+    def __repr__(self):
+        # type: () -> str
+        return "PolygonWithHoles(%r, %r)" % (self.exterior, self.holes)
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        if not isinstance(other, PolygonWithHoles):
+            return False
+        return self.exterior == other.exterior and self.holes == other.holes
 
+    @property
+    def rings(self):
+        # type: () -> List[Polygon3D]
+        """The exterior followed by the holes."""
+        return [self.exterior] + self.holes
+
+    @property
+    def area(self):
+        # type: () -> np.float64
+        return self.exterior.area - sum(hole.area for hole in self.holes)
+
+    @property
+    def normal_vector(self):
+        # type: () -> Vector3D
+        return self.exterior.normal_vector
+
+    @property
+    def distance(self):
+        # type: () -> np.float64
+        return self.exterior.distance
+
+    @property
+    def projection_axis(self):
+        # type: () -> int
+        return self.exterior.projection_axis
+
+    @property
+    def frame(self):
+        # type: () -> PlaneFrame
+        return self.exterior.frame
+
+    def break_up(self):
+        # type: () -> List[Polygon]
+        """Break up the polygon into polygons without holes.
+
+        Each hole splits the polygon which contains it into two, as in `break_polygons`.
+
+        :returns: A list of polygons.
+
+        """
+        pieces = [self.exterior]  # type: List[Polygon]
+        for hole in self.holes:
+            for i, piece in enumerate(pieces):
+                if piece.intersect(hole):
+                    pieces[i : i + 1] = break_polygons(piece, hole)
+                    break
+        return pieces
+
+    def keyhole(self):
+        # type: () -> Polygon3D
+        """Join each hole to the exterior at their closest vertices to make a single polygon.
+
+        The joins run both ways along the same line, so the polygon has zero width there.
+
+        :returns: A polygon.
+
+        """
+        exterior = self.exterior
+        for hole in self.holes:
+            # the hole must run the opposite way to the exterior
+            interior = hole  # type: Polygon
+            if almostequal(interior.normal_vector, exterior.normal_vector):
+                interior = interior.invert_orientation()
+            # find the nearest points on the exterior and interior
+            on_interior, on_exterior = nearest_pairs(interior, exterior)[0]
+            # join them up
+            exterior = Polygon3D(exterior[on_exterior:] + exterior[: on_exterior + 1])
+            ring = interior[on_interior:] + interior[: on_interior + 1]
+            exterior = Polygon3D(exterior[:] + ring)
         return exterior
 
 
+class PlaneFrame(object):
+    """A plane, and the axes used to project polygons in it to and from 2D.
+
+    Polygons in the same plane can share a frame, e.g. the surfaces in a bucket of coplanar surfaces, so that each
+    polygon is only projected to 2D once however many other polygons it is clipped against. Polygons facing the
+    opposite way can share the frame too, since they project in the same way.
+
+    :param normal: Unit normal vector of the plane.
+    :param distance: Distance from the origin to the plane along the normal vector.
+
+    """
+
+    def __init__(self, normal, distance):
+        # type: (Vector3D, np.float64) -> None
+        self.normal = Vector3D(*normal)
+        self.distance = distance
+        components = self.normal.args
+        self.projection_axis = max(range(3), key=lambda i: abs(components[i]))
+        self.basis = [i for i in range(3) if i != self.projection_axis]
+
+    def __repr__(self):
+        # type: () -> str
+        return "PlaneFrame(%r, %r)" % (self.normal, self.distance)
+
+    @classmethod
+    def from_polygon(cls, poly):
+        # type: (Polygon3D) -> PlaneFrame
+        """Create a frame for the plane of a polygon.
+
+        :param poly: A 3D polygon.
+        :returns: A plane frame.
+
+        """
+        return cls(poly.normal_vector, poly.distance)
+
+    def project_to_2D(self, poly):
+        # type: (Polygon3D) -> np.ndarray
+        """Project a polygon in the plane to 2D.
+
+        The projection is stored on the polygon, so it is only computed once for each polygon in the frame.
+
+        :param poly: A 3D polygon in the plane.
+        :returns: A read-only (n, 2) array.
+
+        """
+        cached = poly._cache.get("projection")
+        if cached is None or cached[0] is not self:
+            points = poly._points[:, self.basis]
+            points.setflags(write=False)
+            cached = poly._cache["projection"] = (self, points)
+        return cached[1]
+
+    def project_to_3D(self, points):
+        # type: (Any) -> np.ndarray
+        """Project 2D points back into the plane.
+
+        :param points: An (n, 2) array of points.
+        :returns: An (n, 3) array of points.
+
+        """
+        return project_to_3D(points, self.projection_axis, self.distance, self.normal)
+
+
+def share_frames(polys):
+    # type: (List[Polygon3D]) -> None
+    """Give polygons which are in exactly the same plane a single shared plane frame.
+
+    :param polys: A list of 3D polygons.
+
+    """
+    frames = {}  # type: Dict[Tuple[float, ...], PlaneFrame]
+    for poly in polys:
+        normal = poly.normal_vector
+        distance = poly.distance
+        if normal[poly.projection_axis] < 0:
+            normal, distance = -normal, -distance
+        key = tuple(normal) + (distance,)
+        if key in frames:
+            poly.frame = frames[key]
+        else:
+            frames[key] = poly.frame
+
+
 def break_polygons(poly, hole):
     # type: (Polygon, Polygon) -> List[Polygon]
     """Break up a surface with a hole in it.
@@ -468,16 +824,13 @@ def break_polygons(poly, hole):
 
     """
     # take the two closest points on the surface perimeter
-    links = list(product(poly, hole))
-    links = sorted(
-        links, key=lambda x: x[0].relative_distance(x[1])
-    )  # fast distance check
+    links = nearest_pairs(poly, hole, k=2)
 
-    first_on_poly = links[0][0]
-    last_on_poly = links[1][0]
+    first_on_poly = poly[links[0][0]]
+    last_on_poly = poly[links[1][0]]
 
-    first_on_hole = links[1][1]
-    last_on_hole = links[0][1]
+    first_on_hole = hole[links[1][1]]
+    last_on_hole = hole[links[0][1]]
 
     new_poly = section(first_on_poly, last_on_poly, poly[:] + poly[:]) + section(
         first_on_hole, last_on_hole, reversed(hole[:] + hole[:])
@@ -515,7 +868,7 @@ def project(pt, proj_axis):
     See http://stackoverflow.com/a/39008641/1706564
 
     """
-    return tuple(c for i, c in enumerate(pt) if i != proj_axis)
+    return tuple(project_to_2D([tuple(pt)], proj_axis)[0].tolist())
 
 
 def project_inv(
@@ -532,42 +885,78 @@ def project_inv(
     :returns: The transformed point.
 
     """
-    w = list(pt)
-    w[proj_axis:proj_axis] = [0.0]
-    c = a
-    for i in range(3):
-        c -= w[i] * v[i]
-    c /= v[proj_axis]  # type: ignore[operator]
-    w[proj_axis] = c
-    return tuple(w)
+    return tuple(project_to_3D([tuple(pt)], proj_axis, a, v)[0].tolist())
 
 
 def project_to_2D(vertices, proj_axis):
-    # type: (np.ndarray, int) -> List[Tuple[np.float64, np.float64]]
-    """Project a 3D polygon into 2D space.
+    # type: (Any, int) -> np.ndarray
+    """Project a 3D polygon into 2D space by dropping the projection axis.
 
-    :param vertices: The three-dimensional vertices of the polygon.
+    :param vertices: An (n, 3) array of the three-dimensional vertices of the polygon.
     :param proj_axis: The axis to project into.
-    :returns: The transformed vertices.
+    :returns: An (n, 2) array of the transformed vertices.
 
     """
-    points = [project(x, proj_axis) for x in vertices]
-    return points
+    points = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    return points[:, [i for i in range(3) if i != proj_axis]]
 
 
 def project_to_3D(
     vertices, proj_axis, a, v
-):  # type: (np.ndarray, int, np.float64, Vector3D) -> List[Tuple[np.float64, np.float64, np.float64]]
-    """Project a 2D polygon into 3D space.
+):  # type: (Any, int, np.float64, Vector3D) -> np.ndarray
+    """Project a 2D polygon into the plane `v . w = a` in 3D space.
 
-    :param vertices: The two-dimensional vertices of the polygon.
+    :param vertices: An (n, 2) array of the two-dimensional vertices of the polygon.
     :param proj_axis: The axis to project into.
     :param a: Distance to the origin for the plane to project into.
     :param v: Normal vector of the plane to project into.
-    :returns: The transformed vertices.
+    :returns: An (n, 3) array of the transformed vertices.
 
     """
-    return [project_inv(pt, proj_axis, a, v) for pt in vertices]
+    points = np.asarray(vertices, dtype=float).reshape(-1, 2)
+    w = np.zeros((len(points), 3))
+    w[:, [i for i in range(3) if i != proj_axis]] = points
+    c = a - w[:, 0] * v[0] - w[:, 1] * v[1] - w[:, 2] * v[2]
+    w[:, proj_axis] = c / v[proj_axis]
+    return w
+
+
+def polygon_area(points):
+    # type: (Any) -> np.float64
+    """Area of a planar polygon, half the length of its Newell vector.
+
+    Polygons with fewer than three vertices, or where every vertex is in a straight line with its neighbours (within
+    `DEGENERATE_TOLERANCE`), have no area. This matches `eppy.geometry.surface.area`. A plain loop is used since it is
+    faster than array operations for the handful of vertices in a typical surface. Use `PolygonBatch.areas` for many
+    polygons at once.
+
+    :param points: An (n, 2) or (n, 3) array of vertices. 2D vertices are treated as lying in the xy plane.
+    :returns: The area.
+
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 3:
+        return np.float64(0.0)
+    if points.shape[1] < 3:
+        points = np.hstack([points, np.zeros((n, 3 - points.shape[1]))])
+    vertices = points.tolist()
+    sx = sy = sz = 0.0
+    degenerate = True
+    for i, (x, y, z) in enumerate(vertices):
+        px, py, pz = vertices[i - 1]
+        nx, ny, nz = vertices[(i + 1) % n]
+        sx += (y - ny) * (z + nz)
+        sy += (z - nz) * (x + nx)
+        sz += (x - nx) * (y + ny)
+        if degenerate:
+            ux, uy, uz = x - px, y - py, z - pz
+            wx, wy, wz = nx - px, ny - py, nz - pz
+            cx, cy, cz = uy * wz - uz * wy, uz * wx - ux * wz, ux * wy - uy * wx
+            degenerate = cx * cx + cy * cy + cz * cz < DEGENERATE_TOLERANCE**2
+    if degenerate:
+        return np.float64(0.0)
+    return np.float64(sqrt(sx * sx + sy * sy + sz * sz) / 2)
 
 
 def normalize_coords(
@@ -622,25 +1011,26 @@ def set_starting_position(poly, ggr=None):
     return poly
 
 
-def intersect(poly1, poly2):
-    # type: (Polygon, Polygon) -> List[Polygon]
+def intersect(poly1, poly2, overlay=None):
+    # type: (Polygon, Polygon, Optional[Overlay]) -> List[Union[Polygon, PolygonWithHoles]]
     """Calculate the polygons to represent the intersection of two polygons.
 
+    Where one polygon is inside the other, the difference is returned as a `PolygonWithHoles`.
+
     :param poly1: The first polygon.
     :param poly2: The second polygon.
+    :param overlay: An overlay of the two polygons which has already been used, e.g. to check that they intersect.
+        Default : None, which creates a new overlay.
     :returns: A list of unique polygons.
 
     """
-    polys = []  # type: List[Polygon]
-    polys.extend(poly1.intersect(poly2))
-    polys.extend(poly2.intersect(poly1))
-    if is_hole(poly1, poly2):
-        polys.extend(break_polygons(poly1, poly2))
-    elif is_hole(poly2, poly1):
-        polys.extend(break_polygons(poly2, poly1))
-    else:
-        polys.extend(poly1.difference(poly2))
-        polys.extend(poly2.difference(poly1))
+    if overlay is None:
+        overlay = poly1.overlay(poly2)
+    polys = []  # type: List[Union[Polygon, PolygonWithHoles]]
+    polys.extend(overlay.intersection)
+    polys.extend(overlay.reverse_intersection)
+    polys.extend(overlay.difference)
+    polys.extend(overlay.reverse_difference)
     return polys
 
 
@@ -658,11 +1048,7 @@ def is_hole(surface, possible_hole):
     """
     if surface.area < possible_hole.area:
         return False
-    collinear_edges = (
-        edges[0]._is_collinear(edges[1])
-        for edges in product(surface.edges, possible_hole.edges)
-    )
-    return not any(collinear_edges)
+    return not collinear_edges(surface.edges_array, possible_hole.edges_array).any()
 
 
 def bounding_box(polygons):
@@ -3,10 +3,12 @@ Segment class, representing a line segment.
 
 """
 
-from typing import Any, Iterator  # noqa
+from typing import Any, Iterator, Optional  # noqa
+
+import numpy as np
 
 from .vectors import Vector3D
-from ..utilities import almostequal
+from ..utilities import almostequal, tolerances
 
 if False:
     from .polygons import Polygon3D  # noqa
@@ -66,7 +68,43 @@ class Segment(object):
         :param poly: The polygon to test against.
         :returns: True if segment lies on any edge of the polygon, else False.
         """
-        for edge in poly.edges:
-            if self._is_collinear(edge):
-                return True
-        return False
+        edges = collinear_edges(self.as_array()[np.newaxis], poly.edges_array)
+        return bool(edges.any())
+
+    def as_array(self):
+        # type: () -> np.ndarray
+        """The segment as a (2, 3) array of its start and end points. 2D points have z of zero."""
+        points = np.zeros((2, 3))
+        for i, vertex in enumerate((self.p1, self.p2)):
+            coords = tuple(vertex)[:3]
+            points[i, : len(coords)] = coords
+        return points
+
+
+def collinear_edges(edges1, edges2, places=None):
+    # type: (np.ndarray, np.ndarray, Optional[int]) -> np.ndarray
+    """Test every edge in one array for collinearity with every edge in another.
+
+    This gives the same results as `Segment._is_collinear` for each pair of edges, using a few array operations.
+
+    :param edges1: An (m, 2, 3) array of edges.
+    :param edges2: An (n, 2, 3) array of edges.
+    :param places: Number of decimal places to compare. Default : None, which uses `tolerances.places`.
+    :returns: An (m, n) boolean array which is True where the edges are collinear.
+    """
+    if places is None:
+        places = tolerances.places
+
+    def is_zero(values):
+        # type: (np.ndarray) -> np.ndarray
+        return (np.round(np.abs(values), places) == 0).all(axis=-1)
+
+    edges = np.asarray(edges1, dtype=float)[:, np.newaxis]
+    others = np.asarray(edges2, dtype=float)[np.newaxis]
+    same = is_zero(edges - others).all(axis=-1)
+    reversed_ = is_zero(edges - others[:, :, ::-1]).all(axis=-1)
+    result = np.logical_or(same, reversed_)
+    start, end = others[:, :, 0], others[:, :, 1]
+    for point in (edges[:, :, 0], edges[:, :, 1]):
+        np.logical_or(result, is_zero(np.cross(point - start, point - end)), out=result)
+    return result
@@ -2,20 +2,20 @@
 
 from collections import defaultdict
 from itertools import combinations
-from typing import Dict, List, Tuple, Union  # noqa
+from typing import Dict, List, Optional, Tuple, Union  # noqa
 import warnings
 
 from eppy.bunch_subclass import EpBunch  # noqa
 from eppy.idf_msequence import Idf_MSequence  # noqa
+import numpy as np
 from numpy import float64  # noqa
-from shapely.geometry import Polygon
-from shapely.ops import polygonize
-from shapely.ops import unary_union
+import shapely
 
-from geomeppy.geom.polygons import Polygon2D
-from .polygons import intersect, Polygon3D
+from .batch import PolygonBatch
+from .index import PlaneIndex, SurfaceIndex
+from .polygons import intersect, Polygon3D, PolygonWithHoles, share_frames
 from .vectors import Vector2D, Vector3D  # noqa
-from ..utilities import almostequal
+from ..utilities import almostequal, tolerances
 
 
 def set_coords(
@@ -31,10 +31,7 @@ def set_coords(
     :param coords: The new coordinates as lists of [x,y,z] lists.
     :param ggr: Global geometry rules.
     """
-    coords = list(coords)
-    deduped = [c for i, c in enumerate(coords) if c != coords[(i + 1) % len(coords)]]
-    poly = Polygon3D(deduped)
-    poly = poly.normalize_coords(ggr)
+    poly = normalize_surface_coords(coords, ggr)
     coords = [i for vertex in poly for i in vertex]
     if len(coords) > 120:
         warnings.warn(
@@ -47,6 +44,27 @@ def set_coords(
     surface.obj = surface.obj[:first_x]
     # set the vertex field values
     surface.fieldvalues.extend(coords)
+    # let the IDF know the geometry has changed
+    idf = getattr(surface, "theidf", None)
+    if idf is not None and hasattr(idf, "mark_dirty"):
+        idf.mark_dirty(surface)
+
+
+def normalize_surface_coords(
+    coords,
+    # type: Union[List[Vector3D], List[Tuple[float, float, float]], Polygon3D]
+    ggr,  # type: Union[List, None, Idf_MSequence]
+):
+    # type: (...) -> Polygon3D
+    """Remove repeated vertices and order the coordinates of a surface as `set_coords` would write them.
+
+    :param coords: The new coordinates.
+    :param ggr: Global geometry rules.
+    :returns: The coordinates as a polygon.
+    """
+    coords = list(coords)
+    deduped = [c for i, c in enumerate(coords) if c != coords[(i + 1) % len(coords)]]
+    return Polygon3D(deduped).normalize_coords(ggr)
 
 
 def set_matched_surfaces(surface, matched):
@@ -56,28 +74,34 @@ def set_matched_surfaces(surface, matched):
     :param surface: The first surface.
     :param matched: The second surface.
     """
+    for s, fields in matched_surface_fields(surface, matched):
+        set_fields(s, fields)
+
+
+def matched_surface_fields(surface, matched):
+    # type: (EpBunch, EpBunch) -> List[Tuple[EpBunch, Dict[str, str]]]
+    """Get the boundary conditions for two adjoining surfaces without setting them.
+
+    :param surface: The first surface.
+    :param matched: The second surface.
+    :returns: Pairs of a surface and the field values to set on it.
+    """
+    shading = {"SHADING:SITE:DETAILED", "SHADING:ZONE:DETAILED"}
+    surface_key = str(surface.key).upper()
+    matched_key = str(matched.key).upper()
     if (
-        str(surface.key).upper() == "BUILDINGSURFACE:DETAILED"
-        and str(matched.key).upper() == "BUILDINGSURFACE:DETAILED"
+        surface_key == "BUILDINGSURFACE:DETAILED"
+        and matched_key == "BUILDINGSURFACE:DETAILED"
     ):
-        for s in [surface, matched]:
-            s.Outside_Boundary_Condition = "surface"
-            s.Sun_Exposure = "NoSun"
-            s.Wind_Exposure = "NoWind"
-        surface.Outside_Boundary_Condition_Object = matched.Name
-        matched.Outside_Boundary_Condition_Object = surface.Name
-    elif str(surface.key).upper() == "BUILDINGSURFACE:DETAILED" and str(
-        matched.key
-    ).upper() in ({"SHADING:SITE:DETAILED", "SHADING:ZONE:DETAILED"}):
-        surface.Outside_Boundary_Condition = "adiabatic"
-        surface.Sun_Exposure = "NoSun"
-        surface.Wind_Exposure = "NoWind"
-    elif str(matched.key).upper() == "BUILDINGSURFACE:DETAILED" and str(
-        surface.key
-    ).upper() in ({"SHADING:SITE:DETAILED", "SHADING:ZONE:DETAILED"}):
-        matched.Outside_Boundary_Condition = "adiabatic"
-        matched.Sun_Exposure = "NoSun"
-        matched.Wind_Exposure = "NoWind"
+        return [
+            (s, surface_fields("surface", other.Name, "NoSun", "NoWind"))
+            for s, other in [(surface, matched), (matched, surface)]
+        ]
+    elif surface_key == "BUILDINGSURFACE:DETAILED" and matched_key in shading:
+        return [(surface, surface_fields("adiabatic", None, "NoSun", "NoWind"))]
+    elif matched_key == "BUILDINGSURFACE:DETAILED" and surface_key in shading:
+        return [(matched, surface_fields("adiabatic", None, "NoSun", "NoWind"))]
+    return []
 
 
 def set_unmatched_surface(surface, vector):
@@ -87,62 +111,134 @@ def set_unmatched_surface(surface, vector):
     :param surface: The surface.
     :param vector: The surface normal vector.
     """
+    set_fields(surface, unmatched_surface_fields(surface, vector))
+
+
+def unmatched_surface_fields(surface, vector):
+    # type: (EpBunch, Union[Vector2D, Vector3D]) -> Dict[str, str]
+    """Get the boundary conditions for a surface which does not adjoin another one without setting them.
+
+    :param surface: The surface.
+    :param vector: The surface normal vector.
+    :returns: The field values to set on the surface.
+    """
     if not hasattr(surface, "View_Factor_to_Ground"):
-        return
-    surface.View_Factor_to_Ground = "autocalculate"
-    poly = Polygon3D(surface.coords)
-    if min(poly.zs) < 0 or all(z == 0 for z in poly.zs):
+        return {}
+    fields = {"View_Factor_to_Ground": "autocalculate"}
+    zs = [c[2] for c in surface.coords]
+    if min(zs) < 0 or all(z == 0 for z in zs):
         # below ground or ground-adjacent surfaces
-        surface.Outside_Boundary_Condition_Object = ""
-        surface.Outside_Boundary_Condition = "ground"
-        surface.Sun_Exposure = "NoSun"
-        surface.Wind_Exposure = "NoWind"
+        fields.update(surface_fields("ground", "", "NoSun", "NoWind"))
+    elif almostequal(vector, (0, 0, -1)):
+        # downward facing surfaces
+        fields.update(surface_fields("outdoors", "", "NoSun", "WindExposed"))
     else:
-        surface.Outside_Boundary_Condition = "outdoors"
-        surface.Outside_Boundary_Condition_Object = ""
-        surface.Wind_Exposure = "WindExposed"
-        if almostequal(vector, (0, 0, -1)):
-            # downward facing surfaces
-            surface.Sun_Exposure = "NoSun"
-        else:
-            surface.Sun_Exposure = "SunExposed"  # other external surfaces
+        # other external surfaces
+        fields.update(surface_fields("outdoors", "", "SunExposed", "WindExposed"))
+    return fields
+
 
+def surface_fields(condition, condition_object, sun, wind):
+    # type: (str, Optional[str], str, str) -> Dict[str, str]
+    """Field values for the outside boundary condition of a surface.
 
-def getidfplanes(surfaces):
-    # type: (Idf_MSequence) -> Dict[float64, Dict[Union[Vector2D, Vector3D], List[EpBunch]]]
+    :param condition: The outside boundary condition.
+    :param condition_object: The outside boundary condition object, or None to leave it unchanged.
+    :param sun: The sun exposure.
+    :param wind: The wind exposure.
+    :returns: A dict of field names to values.
+    """
+    fields = {"Outside_Boundary_Condition": condition}
+    if condition_object is not None:
+        fields["Outside_Boundary_Condition_Object"] = condition_object
+    fields["Sun_Exposure"] = sun
+    fields["Wind_Exposure"] = wind
+    return fields
+
+
+def set_fields(surface, fields):
+    # type: (EpBunch, Dict[str, str]) -> None
+    """Set field values on a surface.
+
+    :param surface: The surface.
+    :param fields: A dict of field names to values.
+    """
+    for field, value in fields.items():
+        setattr(surface, field, value)
+
+
+def getidfplanes(surfaces, tolerance=None):
+    # type: (Idf_MSequence, Optional[float]) -> Dict[float64, Dict[Union[Vector2D, Vector3D], List[EpBunch]]]
     """Fast access data structure for potentially matched surfaces.
 
     Get a data structure populated with all the surfaces in the IDF, keyed by their distance from the origin, and their
     normal vector.
 
+    Surfaces whose planes are equal within the tolerance share the same keys, even where rounding would put them either
+    side of a boundary, e.g. at distances of 2.99999999 and 3.00000001. A plane facing the opposite way to an existing
+    plane is keyed by exactly the negated distance and normal vector, so it can be found with
+    `planes[-distance][-vector]`.
+
     :param surfaces: List of all the surfaces.
+    :param tolerance: Maximum difference in normal vector components and distance for planes to be treated as the
+        same plane. Default : None, which uses `tolerances.plane`.
     :returns: Mapping to look up IDF surfaces.
     """
+    if tolerance is None:
+        tolerance = tolerances.plane
     round_factor = 8
+    index = PlaneIndex(tolerance)
+    keys = []  # type: List[Tuple[float64, Vector3D]]
     planes = {}  # type: Dict[float64, Dict[Union[Vector2D, Vector3D], List[EpBunch]]]
-    for s in surfaces:
-        poly = Polygon3D(s.coords)
-        rounded_distance = round(poly.distance, round_factor)
-        rounded_normal_vector = Vector3D(
-            *[round(axis, round_factor) for axis in poly.normal_vector]
-        )
-        planes.setdefault(rounded_distance, {}).setdefault(
-            rounded_normal_vector, []
-        ).append(s)
+    surfaces = list(surfaces)
+    batch = PolygonBatch.from_surfaces(surfaces)
+    for s, normal, poly_distance in zip(surfaces, batch.normals(), batch.distances()):
+        plane = tuple(normal) + (poly_distance,)
+        found = index.query(plane, reverse=False)
+        if found:
+            distance, vector = keys[found[0]]
+        else:
+            found = index.query(plane)
+            if found:
+                distance, vector = keys[found[0]]
+                distance, vector = -distance, -vector
+            else:
+                distance = round(poly_distance, round_factor)
+                vector = Vector3D(*[round(axis, round_factor) for axis in normal])
+            index.add(tuple(vector) + (distance,))
+            keys.append((distance, vector))
+        planes.setdefault(distance, {}).setdefault(vector, []).append(s)
     return planes
 
 
-def get_adjacencies(surfaces):
-    # type: (Idf_MSequence) -> defaultdict
+def get_adjacencies(surfaces, indexed=True):
+    # type: (Idf_MSequence, bool) -> defaultdict
     """Create a dictionary mapping surfaces to their adjacent surfaces.
 
+    By default only pairs of surfaces which are coplanar and have overlapping bounding boxes are compared. Passing
+    `indexed=False` compares every pair of surfaces instead, which gives the same result but is much slower for large
+    models. It is kept as a reference.
+
     :param surfaces: A mutable list of surfaces.
+    :param indexed: Use a spatial index to find candidate pairs. Default : True.
     :returns: Mapping of surfaces to adjacent surfaces.
     """
+    surfaces = list(surfaces)
     adjacencies = defaultdict(list)  # type: defaultdict
+    # made once, so that each surface is only projected once for all of its pairs
+    polys = [Polygon3D(s.coords) for s in surfaces]
+    share_frames(polys)
+    if indexed:
+        batch = PolygonBatch.from_surfaces(surfaces)
+        index = SurfaceIndex(batch, tolerance=10.0**-tolerances.adjacency)
+        pairs = index.candidate_pairs()
+    else:
+        pairs = list(combinations(range(len(surfaces)), 2))
     # find all adjacent surfaces
-    for s1, s2 in combinations(surfaces, 2):
-        adjacencies = populate_adjacencies(adjacencies, s1, s2)
+    for i, j in pairs:
+        adjacencies = populate_adjacencies(
+            adjacencies, surfaces[i], surfaces[j], (polys[i], polys[j])
+        )
     for adjacency, polys in adjacencies.items():
         adjacencies[adjacency] = minimal_set(polys)
     return adjacencies
@@ -151,50 +247,84 @@ def get_adjacencies(surfaces):
 def minimal_set(polys):
     """Remove overlaps from a set of polygons.
 
-    :param polys: List of polygons.
+    The polygons are projected to 2D and their boundaries are noded and polygonized in single calls to shapely's
+    array functions, then the resulting faces are projected back into the plane of the first polygon in one step.
+    Faces with holes in them are broken up into faces without holes, since surfaces cannot have holes.
+
+    :param polys: List of polygons, which may include polygons with holes.
     :returns: List of polygons with no overlaps.
     """
-    normal = polys[0].normal_vector
-    as_2d = [p.project_to_2D() for p in polys]
-    as_shapely = [Polygon(p) for p in as_2d]
-    lines = [p.boundary for p in as_shapely]
-    borders = unary_union(lines)
-    shapes = [Polygon2D(p.boundary.coords) for p in polygonize(borders)]
-    as_3d = [p.project_to_3D(polys[0]) for p in shapes]
+    example = polys[0]
+    normal = example.normal_vector
+    frame = example.frame
+    rings = [
+        frame.project_to_2D(ring)
+        for p in polys
+        for ring in (p.rings if isinstance(p, PolygonWithHoles) else [p])
+    ]
+    indices = np.repeat(np.arange(len(rings)), [len(r) for r in rings])
+    lines = shapely.linearrings(np.concatenate(rings), indices=indices)
+    borders = shapely.union_all(lines)
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(borders)))
+    coords, index = shapely.get_coordinates(
+        shapely.get_exterior_ring(faces), return_index=True
+    )
+    points = frame.project_to_3D(coords)
+    splits = np.flatnonzero(np.diff(index)) + 1
+    as_3d = [Polygon3D(p.tolist()) for p in np.split(points, splits)]
     if not almostequal(as_3d[0].normal_vector, normal):
         as_3d = [p.invert_orientation() for p in as_3d]
-    return [p for p in as_3d if p.area > 0]
+    for i in np.flatnonzero(shapely.get_num_interior_rings(faces)):
+        holes = []
+        for j in range(shapely.get_num_interior_rings(faces[i])):
+            ring = shapely.get_coordinates(shapely.get_interior_ring(faces[i], j))[:-1]
+            hole = Polygon3D(frame.project_to_3D(ring))
+            if not almostequal(hole.normal_vector, normal):
+                hole = hole.invert_orientation()
+            holes.append(hole)
+        exterior = Polygon3D(as_3d[i][:-1])  # drop the repeated closing vertex
+        as_3d[i] = PolygonWithHoles(exterior, holes)
+    minimal = []  # type: List[Polygon3D]
+    for p in as_3d:
+        if not p.area > 0:
+            continue
+        minimal.extend(p.break_up() if isinstance(p, PolygonWithHoles) else [p])
+    return minimal
 
 
-def populate_adjacencies(adjacencies, s1, s2):
-    # type: (defaultdict, EpBunch, EpBunch) -> defaultdict
+def populate_adjacencies(adjacencies, s1, s2, polys=None):
+    # type: (defaultdict, EpBunch, EpBunch, Optional[Tuple[Polygon3D, Polygon3D]]) -> defaultdict
     """Update the adjacencies dict with any intersections between two surfaces.
 
     :param adjacencies: Dict to contain lists of adjacent surfaces.
     :param s1: Object representing an EnergyPlus surface.
     :param s2: Object representing an EnergyPlus surface.
+    :param polys: Polygons of the two surfaces, if they have already been made. Default : None, which makes them from
+        the surface coordinates.
     :returns: An updated dict of adjacencies.
     """
-    poly1 = Polygon3D(s1.coords)
-    poly2 = Polygon3D(s2.coords)
-    if not almostequal(abs(poly1.distance), abs(poly2.distance), 4):
+    places = tolerances.adjacency
+    if polys is None:
+        polys = Polygon3D(s1.coords), Polygon3D(s2.coords)
+    poly1, poly2 = polys
+    if not almostequal(abs(poly1.distance), abs(poly2.distance), places):
         return adjacencies
-    if not almostequal(poly1.normal_vector, poly2.normal_vector, 4):
-        if not almostequal(poly1.normal_vector, -poly2.normal_vector, 4):
+    if not almostequal(poly1.normal_vector, poly2.normal_vector, places):
+        if not almostequal(poly1.normal_vector, -poly2.normal_vector, places):
             return adjacencies
 
-    intersection = poly1.intersect(poly2)
-    if intersection:
-        new_surfaces = intersect(poly1, poly2)
+    overlay = poly1.overlay(poly2)
+    if overlay.intersection:
+        new_surfaces = intersect(poly1, poly2, overlay)
         new_s1 = [
             s
             for s in new_surfaces
-            if almostequal(s.normal_vector, poly1.normal_vector, 4)
+            if almostequal(s.normal_vector, poly1.normal_vector, places)
         ]
         new_s2 = [
             s
             for s in new_surfaces
-            if almostequal(s.normal_vector, poly2.normal_vector, 4)
+            if almostequal(s.normal_vector, poly2.normal_vector, places)
         ]
         adjacencies[(s1.key, s1.Name)] += new_s1
         adjacencies[(s2.key, s2.Name)] += new_s2
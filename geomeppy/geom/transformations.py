@@ -63,13 +63,13 @@ class Transformation(object):
         # check if face normal is up or down
         if abs(zp.dot(z_axis)) < 0.99:
             # not facing up or down, set yPrime along z_axis
-            yp = z_axis - zp.dot(z_axis) * zp  # type: ignore[operator]
-            yp = yp.normalize()
-            xp = yp.cross(zp)
+            y_dir = z_axis - zp.dot(z_axis) * zp  # type: ignore[operator]
+            yp = y_dir.normalize()
+            xp = yp.cross(zp)  # type: Union[Vector2D, Vector3D]
         else:
             # facing up or down, set xPrime along -x_axis
-            xp = neg_x_axis - zp.dot(neg_x_axis) * zp  # type: ignore[operator]
-            xp = xp.normalize()
+            x_dir = neg_x_axis - zp.dot(neg_x_axis) * zp  # type: ignore[operator]
+            xp = x_dir.normalize()
             yp = zp.cross(xp)
 
         self.matrix[:3, 0] = xp
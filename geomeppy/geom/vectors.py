@@ -11,24 +11,83 @@ if False:
     from .polygons import Polygon3D  # noqa
 
 
+class VectorArgs(list):
+    """The coordinates of a vector as a list, which sets items on the vector too.
+
+    :param vector: The vector.
+
+    """
+
+    def __init__(self, vector):
+        # type: (Vector2D) -> None
+        super(VectorArgs, self).__init__(vector)
+        self.vector = vector
+
+    def __setitem__(self, key, value):
+        # type: (Any, Any) -> None
+        super(VectorArgs, self).__setitem__(key, value)
+        self.vector.args = list(self)
+
+
 class Vector2D(Sized, Iterable):
-    """Two dimensional point."""
+    """Two dimensional point.
+
+    Vectors use `__slots__` and keep their coordinates as plain floats, so they are cheap to create and to do
+    arithmetic with. A 2D vector created from three values keeps the third value when iterated, but its `z` is 0.
+
+    """
+
+    __slots__ = ("x", "y", "z", "_rest")
 
     def __init__(self, *args):
         # type: (*Any) -> None
-        self.args = list(args)
         self.x = float(args[0])
         self.y = float(args[1])
         self.z = 0.0
+        self._rest = tuple(float(a) for a in args[2:])
+
+    @classmethod
+    def _new(cls, x, y, z=0.0):
+        # type: (float, float, float) -> Any
+        """Create a vector from floats without any conversion."""
+        v = object.__new__(cls)
+        v.x = x
+        v.y = y
+        v.z = z
+        v._rest = ()
+        return v
+
+    @property
+    def args(self):
+        # type: () -> List[float]
+        """The coordinates of the vector as a list.
+
+        Setting an item of the list, e.g. `v.args[0] = 1`, also sets it on the vector.
+        """
+        return VectorArgs(self)
+
+    @args.setter
+    def args(self, values):
+        # type: (Iterable[Any]) -> None
+        type(self).__init__(self, *values)
 
     def __iter__(self):
         # type: () -> Iterator
-        return (i for i in self.args)
+        yield self.x
+        yield self.y
+        for a in self._rest:
+            yield a
 
     def __repr__(self):
         # type: () -> str
         class_name = type(self).__name__
-        return "{}({!r}, {!r})".format(class_name, *self.args)
+        return "{}({})".format(class_name, ", ".join(repr(a) for a in self))
+
+    def __getstate__(self):
+        return self.x, self.y, self.z, self._rest
+
+    def __setstate__(self, state):
+        self.x, self.y, self.z, self._rest = state
 
     def __eq__(self, other):
         for a, b in zip(self, other):
@@ -38,19 +97,30 @@ class Vector2D(Sized, Iterable):
 
     def __sub__(self, other):
         # type: (Any) -> Union[Vector2D, Vector3D]
+        if type(other) is type(self) and not self._rest and not other._rest:
+            return self._new(self.x - other.x, self.y - other.y, self.z - other.z)
         return self.__class__(*[self[i] - other[i] for i in range(len(self))])
 
     def __add__(self, other):
         # type: (Any) -> Union[Vector2D, Vector3D]
+        if type(other) is type(self) and not self._rest and not other._rest:
+            return self._new(self.x + other.x, self.y + other.y, self.z + other.z)
         return self.__class__(*[self[i] + other[i] for i in range(len(self))])
 
+    def __mul__(self, other):
+        # type: (float) -> Union[Vector2D, Vector3D]
+        """Multiply by a scalar."""
+        return self.__class__(*[a * other for a in self])
+
+    __rmul__ = __mul__
+
     def __neg__(self):
         # type: () -> Union[Vector2D, Vector3D]
         return self.__class__(*inverse_vector(self))
 
     def __len__(self):
         # type: () -> int
-        return len(self.args)
+        return 2 + len(self._rest)
 
     def __getitem__(self, key):
         # type: (Union[int, slice]) -> Union[Any, List[Any]]
@@ -63,18 +133,18 @@ class Vector2D(Sized, Iterable):
         return hash(self.x) ^ hash(self.y)
 
     def dot(self, other):
-        # type: (Vector3D) -> np.float64
-        return np.dot(self, other)  # type: ignore[call-overload]
+        # type: (Iterable[float]) -> float
+        return sum(a * b for a, b in zip(self, other))
 
     def cross(self, other):
-        # type: (Union[Vector2D, Vector3D]) -> np.ndarray
-        return np.cross(self, other)  # type: ignore[call-overload]
+        # type: (Union[Vector2D, Vector3D]) -> Vector3D
+        return Vector3D(self.x, self.y, self.z).cross(other)
 
     @property
     def length(self):
         # type: () -> float
         """The length of a vector."""
-        length = sum(x**2 for x in self.args) ** 0.5
+        length = sum(x**2 for x in self) ** 0.5
 
         return length
 
@@ -103,7 +173,7 @@ class Vector2D(Sized, Iterable):
         # type: (float) -> Union[Vector2D, Vector3D]
         current_length = self.length
         multiplier = new_length / current_length
-        self.args = [i * multiplier for i in self.args]
+        self.args = [i * multiplier for i in self]
         return self
 
     def invert(self):
@@ -171,6 +241,8 @@ class Vector2D(Sized, Iterable):
 class Vector3D(Vector2D):
     """Three dimensional point."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         x,  # type: Union[float, np.float64]
@@ -178,19 +250,80 @@ class Vector3D(Vector2D):
         z=0,  # type: Union[float, np.float64]
     ):
         # type: (...) -> None
-        super(Vector3D, self).__init__(x, y, z)
+        self.x = float(x)
+        self.y = float(y)
         self.z = float(z)
-        self.args = [self.x, self.y, self.z]
+        self._rest = ()
+
+    def __iter__(self):
+        # type: () -> Iterator
+        yield self.x
+        yield self.y
+        yield self.z
 
     def __repr__(self):
         # type: () -> str
         class_name = type(self).__name__
-        return "{}({!r}, {!r}, {!r})".format(class_name, *self.args)
+        return "{}({!r}, {!r}, {!r})".format(class_name, self.x, self.y, self.z)
+
+    def __eq__(self, other):
+        if isinstance(other, Vector3D):
+            return self.x == other.x and self.y == other.y and self.z == other.z
+        return super(Vector3D, self).__eq__(other)
 
     def __hash__(self):
         # type: () -> int
         return hash(self.x) ^ hash(self.y) ^ hash(self.z)
 
+    def __len__(self):
+        # type: () -> int
+        return 3
+
+    def __getitem__(self, key):
+        # type: (Union[int, slice]) -> Union[Any, List[Any]]
+        return (self.x, self.y, self.z)[key]
+
+    def __neg__(self):
+        # type: () -> Vector3D
+        return self._new(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        # type: (float) -> Vector3D
+        """Multiply by a scalar."""
+        return self._new(self.x * other, self.y * other, self.z * other)
+
+    __rmul__ = __mul__
+
+    @property
+    def length(self):
+        # type: () -> float
+        """The length of a vector."""
+        return (self.x**2 + self.y**2 + self.z**2) ** 0.5
+
+    def dot(self, other):
+        # type: (Union[Vector3D, Iterable[float]]) -> float
+        if isinstance(other, Vector3D):
+            return self.x * other.x + self.y * other.y + self.z * other.z
+        return super(Vector3D, self).dot(other)
+
+    def cross(self, other):
+        # type: (Union[Vector2D, Vector3D]) -> Vector3D
+        if not isinstance(other, Vector3D):
+            other = Vector3D(other.x, other.y, other.z)
+        return self._new(
+            self.y * other.z - self.z * other.y,
+            self.z * other.x - self.x * other.z,
+            self.x * other.y - self.y * other.x,
+        )
+
+    def set_length(self, new_length):
+        # type: (float) -> Vector3D
+        multiplier = new_length / self.length
+        self.x *= multiplier
+        self.y *= multiplier
+        self.z *= multiplier
+        return self
+
 
 def inverse_vector(v):
     # type: (Union[Vector2D, Vector3D]) -> List[float]
@@ -201,3 +334,64 @@ def inverse_vector(v):
 
     """
     return [-i for i in v]
+
+
+def squared_distances(points1, points2):
+    # type: (Any, Any) -> np.ndarray
+    """Squared distances between every point in one set and every point in another.
+
+    These are the same values as `Vector2D.relative_distance` for each pair of points.
+
+    :param points1: A sequence of n vectors, or an array with a point in each row.
+    :param points2: A sequence of m vectors, or an array with a point in each row.
+    :returns: An (n, m) array.
+
+    """
+    first, second = _as_points(points1), _as_points(points2)
+    width = max(first.shape[1], second.shape[1])
+    first = np.pad(first, ((0, 0), (0, width - first.shape[1])))
+    second = np.pad(second, ((0, 0), (0, width - second.shape[1])))
+    difference = first[:, np.newaxis] - second[np.newaxis]
+    return (difference**2).sum(axis=-1)
+
+
+def nearest_pairs(points1, points2, k=1):
+    # type: (Any, Any, Optional[int]) -> List[Tuple[int, int]]
+    """The closest pairs of points with one point from each of two sets.
+
+    Pairs are ordered by distance. Pairs at the same distance are in the order given by `itertools.product`, so the
+    result is the same as sorting the product of the two sets by `Vector2D.relative_distance`.
+
+    :param points1: A sequence of n vectors, or an array with a point in each row.
+    :param points2: A sequence of m vectors, or an array with a point in each row.
+    :param k: The number of pairs to return. Default : 1. None returns all n * m pairs.
+    :returns: A list of `(i, j)` indices into `points1` and `points2`.
+
+    """
+    distances = squared_distances(points1, points2)
+    flat = distances.ravel()
+    if k is None or k >= len(flat):
+        order = np.argsort(flat, kind="stable")
+    else:
+        if k <= 0:
+            return []
+        # any pair as close as the kth closest pair, including ties, is a candidate
+        kth = np.partition(flat, k - 1)[k - 1]
+        candidates = np.flatnonzero(flat <= kth)
+        order = candidates[np.argsort(flat[candidates], kind="stable")][:k]
+    m = distances.shape[1]
+    return [(int(i) // m, int(i) % m) for i in order]
+
+
+def _as_points(points):
+    # type: (Any) -> np.ndarray
+    if hasattr(points, "points_matrix"):
+        return np.asarray(points.points_matrix, dtype=float)
+    if isinstance(points, np.ndarray):
+        return points.astype(float).reshape(len(points), -1)
+    rows = [tuple(p) for p in points]
+    width = max((len(r) for r in rows), default=0)
+    array = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        array[i, : len(row)] = row
+    return array
@@ -2,18 +2,26 @@
 This module contains the implementation of `geomeppy.IDF`.
 """
 
+import copy
 import itertools
-from typing import Any, Dict, Iterable, List, Optional, Union  # noqa
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union  # noqa
 
 from eppy.bunch_subclass import EpBunch  # noqa
 from eppy.idf_msequence import Idf_MSequence  # noqa
 
-from .geom.intersect_match import intersect_idf_surfaces, match_idf_surfaces
+from .geom.intersect_match import (  # noqa
+    ChangePlan,
+    get_changed_planes,
+    intersect_idf_surfaces,
+    match_idf_surfaces,
+)
 from .builder import Block, Zone
+from .geom.adjacency import AdjacencyGraph
 from .geom.polygons import bounding_box, Polygon2D  # noqa
 from .geom.vectors import Vector2D, Vector3D  # noqa
 from .io.obj import export_to_obj
-from .patches import PatchedIDF
+from .geom.surfaces import set_coords
+from .patches import makeabunch, PatchedIDF
 from .recipes import (
     set_default_constructions,
     set_wwr,
@@ -45,21 +53,157 @@ class IDF(PatchedIDF):
 
     """
 
-    def intersect_match(self):
-        # type: () -> None
-        """Intersect all surfaces in the IDF, then set boundary conditions."""
-        self.intersect()
-        self.match()
+    def __init__(self, *args, **kwargs):
+        # type: (*Any, **Any) -> None
+        super(IDF, self).__init__(*args, **kwargs)
+        self._dirty_surfaces = {}  # type: Dict[int, EpBunch]
+        self._adjacency_graph = None  # type: Optional[AdjacencyGraph]
+
+    @property
+    def dirty_surfaces(self):
+        # type: () -> List[EpBunch]
+        """Surfaces which have had their coordinates set since the last call to `intersect_match`."""
+        surfaces = self.getsurfaces() + self.getshadingsurfaces()
+        return [s for s in surfaces if id(s) in self._dirty_surfaces]
+
+    def mark_dirty(self, surface):
+        # type: (EpBunch) -> None
+        """Record that the coordinates of a surface have changed.
+
+        This is called by `EpBunch.setcoords` and `set_coords` so it should not usually be needed.
+
+        :param surface: The changed surface.
+
+        """
+        self._dirty_surfaces[id(surface)] = surface
+        self._adjacency_graph = None
+
+    def adjacency_graph(self):
+        # type: () -> AdjacencyGraph
+        """Get the surfaces and zones which adjoin each other, and the areas they share.
+
+        The graph is built when surfaces are matched and cached until the geometry changes. If surfaces have not been
+        matched since the last change, it is built from the existing boundary conditions.
 
-    def intersect(self):
+        :returns: An adjacency graph.
+
+        """
+        if self._adjacency_graph is None:
+            self._adjacency_graph = AdjacencyGraph.from_surfaces(self.getsurfaces())
+        return self._adjacency_graph
+
+    def clear_adjacency_graph(self):
         # type: () -> None
-        """Intersect all surfaces in the IDF."""
-        intersect_idf_surfaces(self)
+        """Discard the cached adjacency graph, e.g. after boundary conditions have been changed by hand."""
+        self._adjacency_graph = None
+
+    def intersect_match(self, workers=None, incremental=False, plan_only=False):
+        # type: (Optional[int], bool, bool) -> Optional[ChangePlan]
+        """Intersect all surfaces in the IDF, then set boundary conditions.
+
+        :param workers: Number of worker processes to use for intersecting. Default : None (no worker processes).
+        :param incremental: Only intersect and match the planes which contain surfaces that have changed since the
+            last call to `intersect_match`. Surfaces in other planes keep their existing splits and boundary
+            conditions. Default : False.
+        :param plan_only: Work out the changes without making them, and return them as a change plan which can be
+            applied later with `ChangePlan.apply`. Default : False.
+        :returns: A change plan if `plan_only` is True, else None.
+
+        """
+        if plan_only:
+            surfaces = self.getsurfaces() + self.getshadingsurfaces()
+            if incremental:
+                surfaces = get_changed_planes(surfaces, self.dirty_surfaces)
+            plan = intersect_idf_surfaces(
+                self, workers=workers, surfaces=surfaces, plan_only=True
+            )
+            assert plan is not None
+            try:
+                ggr = self.idfobjects["GLOBALGEOMETRYRULES"][0]
+            except IndexError:
+                ggr = None
+            planned = plan.planned_surfaces(surfaces, ggr)
+            match_plan = match_idf_surfaces(self, surfaces=planned, plan_only=True)
+            assert isinstance(match_plan, ChangePlan)
+            plan.boundary_conditions = match_plan.boundary_conditions
+            return plan
+        if incremental:
+            selected = get_changed_planes(
+                self.getsurfaces() + self.getshadingsurfaces(), self.dirty_surfaces
+            )
+            intersect_idf_surfaces(self, workers=workers, surfaces=selected)
+            # match the planes selected before intersecting, where surfaces may refer
+            # to surfaces which the intersection has renamed, and any planes holding
+            # new surfaces from the intersection, which are dirty
+            surfaces = self.getsurfaces() + self.getshadingsurfaces()
+            selected_ids = {id(s) for s in selected}
+            changed = [s for s in surfaces if id(s) in selected_ids]
+            surfaces = get_changed_planes(surfaces, changed + self.dirty_surfaces)
+            match_idf_surfaces(self, surfaces=surfaces)
+            self._adjacency_graph = None
+        else:
+            self.intersect(workers=workers)
+            self.match()
+        self._dirty_surfaces.clear()
+        return None
+
+    def intersect(self, workers=None):
+        # type: (Optional[int]) -> None
+        """Intersect all surfaces in the IDF.
+
+        :param workers: Number of worker processes to use. Default : None (no worker processes).
+
+        """
+        intersect_idf_surfaces(self, workers=workers)
+        self._adjacency_graph = None
 
     def match(self):
         # type: () -> None
         """Set boundary conditions for all surfaces in the IDF."""
-        match_idf_surfaces(self)
+        pairs = match_idf_surfaces(self)
+        assert isinstance(pairs, list)
+        self._adjacency_graph = AdjacencyGraph(pairs)
+
+    def replace_surfaces(self, mapping):
+        # type: (Dict[Tuple[str, str], List[Any]]) -> None
+        """Replace surfaces with new surfaces in a single pass over the IDF objects.
+
+        Each surface is removed and replaced by copies of itself named `<name>_1`, `<name>_2`, etc. with the new
+        coordinates. New surfaces are added at the end of their object list. This gives the same result as using
+        `getobject`, `copyidfobject` and `removeidfobject` for each surface, but avoids scanning the object lists
+        once per surface.
+
+        :param mapping: Mapping from `(key, name)` of existing surfaces to a list of coordinates for the new surfaces.
+
+        """
+        try:
+            ggr = self.idfobjects["GLOBALGEOMETRYRULES"][0]
+        except IndexError:
+            ggr = None
+        by_key = {}  # type: Dict[str, List[Tuple[str, List[Any]]]]
+        for (key, name), new_surfaces in mapping.items():
+            by_key.setdefault(key.upper(), []).append((name, new_surfaces))
+        for key, replacements in by_key.items():
+            objects = self.idfobjects[key]
+            key_i = self.model.dtls.index(key)
+            lookup = {}  # type: Dict[str, EpBunch]
+            for bunch in objects:
+                lookup.setdefault(bunch.Name.upper(), bunch)
+            removed = set()
+            added = []
+            for name, new_surfaces in replacements:
+                old_obj = lookup[name.upper()]
+                for i, new_coords in enumerate(new_surfaces, 1):
+                    new = makeabunch(self.idd_info, copy.copy(old_obj.obj), key_i)
+                    new.theidf = self
+                    new.Name = "%s_%i" % (name, i)
+                    set_coords(new, new_coords, ggr)
+                    added.append(new)
+                old_obj.theidf = None
+                removed.add(id(old_obj))
+            # update the bunches and the model data together to keep them in sync
+            objects.list1[:] = [b for b in objects if id(b) not in removed] + added
+            objects.list2[:] = [b.obj for b in objects.list1]
 
     def translate_to_origin(self):
         # type: () -> None
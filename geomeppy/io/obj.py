@@ -28,7 +28,6 @@ Example polygon::
 
 """
 
-from itertools import product
 import shutil
 from typing import List, Optional, Set  # noqa
 import os
@@ -38,7 +37,7 @@ import pypoly2tri as p2t
 if False:
     from ..idf import IDF  # noqa
 from ..geom.polygons import Polygon2D, Polygon3D
-from ..geom.vectors import Vector3D  # noqa
+from ..geom.vectors import nearest_pairs, Vector3D  # noqa
 
 THIS_DIR = os.path.abspath(os.path.dirname(__file__))
 
@@ -88,14 +87,15 @@ class ObjWriter(object):
         outer_poly = Polygon3D(surface.coords)
         inner_poly = Polygon3D(subsurface.coords)
         for edge in outer_poly.edges:
-            links = product(edge, inner_poly)
             pt1, pt2 = edge
-            links = sorted(links, key=lambda x: x[0].relative_distance(x[1]))
+            links = [
+                (edge.vertices[i], inner_poly[j])
+                for i, j in nearest_pairs(edge.vertices, inner_poly, k=None)
+            ]
             t1 = [links[0][0], links[0][1], pt2 if pt1 in links[0] else pt1]
-            links = sorted(
-                [l for l in links[1:] if links[0][0] not in l and links[0][1] not in l],
-                key=lambda x: x[0].relative_distance(x[1]),
-            )
+            links = [
+                l for l in links[1:] if links[0][0] not in l and links[0][1] not in l
+            ]
             t2 = (links[0][0], links[0][1], [pt for pt in t1 if pt in inner_poly][0])
             self.add_face(t1, surface.Surface_Type)
             self.add_face(t2, surface.Surface_Type)
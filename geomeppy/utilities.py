@@ -1,23 +1,105 @@
 """Utilities for use in geomeppy."""
 
-from typing import Any  # noqa
+from collections.abc import Iterable
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional  # noqa
 
+import numpy as np
 
-def almostequal(first, second, places=7):
-    # type: (Any, Any, int) -> bool
-    """Tests a range of types for near equality."""
+_NUMBERS = (int, float, np.number)
+_NUMERIC_KINDS = "biuf"
+
+
+class Tolerances(object):
+    """Tolerances used when comparing geometry.
+
+    The module-level `tolerances` object is read by geomeppy's geometry functions. Change its attributes to change
+    the tolerances everywhere, or use `override_tolerances` to change them temporarily.
+
+    :param places: Decimal places used by `almostequal` and when matching vertices. Default : 7.
+    :param adjacency: Decimal places used when checking whether surfaces are in the same plane before intersecting
+        them. Default : 4.
+    :param plane: Maximum difference in normal vector components and distance for planes to be treated as the same
+        plane when grouping surfaces. Default : 1e-6.
+
+    """
+
+    def __init__(self, places=7, adjacency=4, plane=1e-6):
+        # type: (int, int, float) -> None
+        self.places = places
+        self.adjacency = adjacency
+        self.plane = plane
+
+    def __repr__(self):
+        # type: () -> str
+        return "Tolerances(places=%r, adjacency=%r, plane=%r)" % (
+            self.places,
+            self.adjacency,
+            self.plane,
+        )
+
+
+tolerances = Tolerances()
+
+
+@contextmanager
+def override_tolerances(**kwargs):
+    # type: (**Any) -> Iterator[Tolerances]
+    """Temporarily change tolerances, e.g. `with override_tolerances(places=5): ...`.
+
+    :param kwargs: New values for attributes of `tolerances`.
+    :returns: The tolerances, with the new values set.
+    """
+    for name in kwargs:
+        if not hasattr(tolerances, name):
+            raise AttributeError("Unknown tolerance: %s" % name)
+    previous = {name: getattr(tolerances, name) for name in kwargs}
+    for name, value in kwargs.items():
+        setattr(tolerances, name, value)
+    try:
+        yield tolerances
+    finally:
+        for name, value in previous.items():
+            setattr(tolerances, name, value)
+
+
+def almostequal(first, second, places=None):
+    # type: (Any, Any, Optional[int]) -> bool
+    """Tests a range of types for near equality.
+
+    Numbers are equal if their difference rounds to zero at the given number of decimal places. Numeric arrays of the
+    same shape are compared in one operation, other iterables element by element, and anything else as strings.
+
+    :param first: The first value.
+    :param second: The second value.
+    :param places: Number of decimal places to compare. Default : None, which uses `tolerances.places`.
+    :returns: True if the values are almost equal, else False.
+    """
+    if places is None:
+        places = tolerances.places
+    if isinstance(first, _NUMBERS) and isinstance(second, _NUMBERS):
+        return round(abs(second - first), places) == 0
+    if isinstance(first, np.ndarray) or isinstance(second, np.ndarray):
+        first = np.asarray(first)
+        second = np.asarray(second)
+        if (
+            first.shape == second.shape
+            and first.dtype.kind in _NUMERIC_KINDS
+            and second.dtype.kind in _NUMERIC_KINDS
+        ):
+            return bool((np.round(np.abs(second - first), places) == 0).all())
+        first = first.tolist()
+        second = second.tolist()
+    if (
+        isinstance(first, Iterable)
+        and isinstance(second, Iterable)
+        and not isinstance(first, str)
+        and not isinstance(second, str)
+    ):
+        return all(almostequal(a, b, places) for a, b in zip(first, second))
     try:
-        # try converting to float first
-        first = float(first)
-        second = float(second)
-        # test floats for near-equality
-        if round(abs(second - first), places) != 0:
-            return False
-        else:
-            return True
-    except ValueError:
+        # try converting to float, e.g. for numeric strings
+        return round(abs(float(second) - float(first)), places) == 0
+    except (TypeError, ValueError):
         # handle non-float types
         return str(first) == str(second)
-    except TypeError:
-        # handle iterables
-        return all([almostequal(a, b, places) for a, b in zip(first, second)])
@@ -7,6 +7,7 @@ import pytest
 from eppy.iddcurrent import iddcurrent
 from io import StringIO
 
+from geomeppy.geom.backends import use_backend
 from geomeppy.idf import IDF
 
 if not os.getenv("CI"):
@@ -124,3 +125,10 @@ def extracts_idf():
         IDF.setiddname(iddfhandle)
 
     return IDF(StringIO(extracts_idf_txt))
+
+
+@pytest.fixture(params=["pyclipper", "shapely"])
+def clipping_backend(request):
+    """Run a test with each of the clipping backends."""
+    with use_backend(request.param):
+        yield request.param
@@ -0,0 +1,58 @@
+"""Tests for clipping backends."""
+
+import numpy as np
+import pytest
+
+from geomeppy.geom.backends import (
+    DIFFERENCE,
+    get_backend,
+    INTERSECTION,
+    set_backend,
+    use_backend,
+)
+from geomeppy.geom.polygons import Polygon3D
+
+
+def test_use_backend():
+    # type: () -> None
+    assert get_backend().name == "pyclipper"
+    with use_backend("shapely") as backend:
+        assert backend.name == "shapely"
+        assert get_backend() is backend
+    assert get_backend().name == "pyclipper"
+    with pytest.raises(ValueError):
+        set_backend("spam")
+    assert get_backend().name == "pyclipper"
+
+
+def test_backends_agree():
+    # type: () -> None
+    plate = Polygon3D([(0, 2, 0), (0, 0, 0), (4, 0, 0), (4, 2, 0)])
+    zones = [
+        Polygon3D([(0, 2, 0), (0, 0, 0), (1, 0, 0), (1, 2, 0)]),
+        Polygon3D([(0.5, 1, 0), (0.5, 0, 0), (3, 0, 0), (3, 1, 0)]),
+        Polygon3D([(9, 2, 0), (9, 0, 0), (10, 0, 0), (10, 2, 0)]),
+        Polygon3D([(2, 1.5, 0), (2, 0.5, 0), (3, 0.5, 0), (3, 1.5, 0)]),
+    ]
+    results = {}
+    for name in ["pyclipper", "shapely"]:
+        with use_backend(name):
+            results[name] = (
+                plate.intersect_many(zones),
+                plate.difference_many(zones),
+                [plate.overlay(zone).reverse_difference for zone in zones],
+            )
+    assert results["pyclipper"] == results["shapely"]
+
+
+@pytest.mark.parametrize("name", ["pyclipper", "shapely"])
+def test_session_reset(name):
+    # type: (str) -> None
+    big = np.array([(0, 0), (4, 0), (4, 4), (0, 4)], dtype=float)
+    small = np.array([(1, 1), (2, 1), (2, 2), (1, 2)], dtype=float)
+    session = get_backend(name).session(big, [small])
+    assert len(session.execute(DIFFERENCE)) == 2  # exterior and hole
+    session.reset(small, [big])
+    assert session.execute(DIFFERENCE) == []
+    expected = get_backend(name).session(small, [big]).execute(INTERSECTION)
+    assert session.execute(INTERSECTION) == expected
@@ -0,0 +1,50 @@
+"""Tests for batches of polygons."""
+
+import numpy as np
+import pytest
+
+from geomeppy.geom.batch import PolygonBatch
+from geomeppy.geom.polygons import Polygon3D
+from geomeppy.idf import IDF  # noqa
+
+
+def test_polygon_batch():
+    # type: () -> None
+    polys = [
+        Polygon3D([(0, 0, 0), (0, 2, 0), (2, 2, 0), (2, 0, 0)]),
+        Polygon3D([(0, 0, 3), (1, 0, 3), (1, 1, 3)]),
+        Polygon3D([(1, 0, 0), (1, 0, 1), (1, 2, 1), (1, 2, 0), (1, 1, -1)]),
+    ]
+    batch = PolygonBatch(polys)
+    assert len(batch) == 3
+    assert batch.counts.tolist() == [4, 3, 5]
+    assert batch.offsets.tolist() == [0, 4, 7]
+    for i, poly in enumerate(polys):
+        assert np.allclose(batch.normals()[i], tuple(poly.normal_vector))
+        assert np.isclose(batch.distances()[i], poly.distance)
+        assert np.isclose(batch.areas()[i], poly.area)
+        assert np.allclose(batch.centroids()[i], tuple(poly.centroid))
+    mins, maxs = batch.bounding_boxes()
+    assert mins.tolist() == [[0, 0, 0], [0, 0, 3], [1, 0, -1]]
+    assert maxs.tolist() == [[2, 2, 0], [1, 1, 3], [1, 2, 1]]
+
+
+def test_polygon_batch_from_coords():
+    # type: () -> None
+    batch = PolygonBatch([[(0, 0, 1), (0, 1, 1), (1, 1, 1)]])
+    assert batch.normals().tolist() == [[0, 0, -1]]
+    assert batch.distances().tolist() == [-1]
+    empty = PolygonBatch([])
+    assert len(empty) == 0
+    assert empty.normals().shape == (0, 3)
+    assert empty.distances().shape == (0,)
+    with pytest.raises(ValueError):
+        PolygonBatch([[]])
+
+
+def test_polygon_batch_surfaces(base_idf):
+    # type: (IDF) -> None
+    surfaces = base_idf.getsurfaces()
+    batch = PolygonBatch.from_surfaces(surfaces)
+    for s, area in zip(surfaces, batch.areas()):
+        assert np.isclose(area, Polygon3D(s.coords).area)
@@ -0,0 +1,60 @@
+"""Tests for spatial indexes."""
+
+from geomeppy.geom.index import PlaneIndex, SurfaceIndex
+from geomeppy.geom.polygons import Polygon3D
+from geomeppy.geom.surfaces import getidfplanes
+
+
+def test_plane_index():
+    # type: () -> None
+    index = PlaneIndex(1e-6)
+    floor = index.add((0, 0, -1, 0))
+    ceiling = index.add((0, 0, 1, 3.00000001))
+    wall = index.add((1, 0, 0, 3))
+    assert index.query((0, 0, 1, 2.99999999)) == [ceiling]
+    assert index.query((0, 0, -1, -2.99999999)) == [ceiling]
+    assert index.query((0, 0, -1, -2.99999999), reverse=False) == []
+    assert index.query((0, 0, 1, 0)) == [floor]
+    assert index.query((0.9999999, 0, 0, 3.0000001)) == [wall]
+    assert index.query((0, 0, 1, 3.00001)) == []
+
+
+def test_plane_index_cell_edges():
+    # type: () -> None
+    """Planes within tolerance either side of a cell boundary are found."""
+    index = PlaneIndex(0.5)
+    index.add((0, 0, 1, 0.99))
+    assert index.query((0, 0, 1, 1.01)) == [0]
+    assert index.query((0, 0, 1, 1.49)) == [0]
+    assert index.query((0, 0, 1, 1.5)) == []
+
+
+def test_surface_index():
+    # type: () -> None
+    polys = [
+        Polygon3D([(0, 1, 0), (0, 0, 0), (1, 0, 0), (1, 1, 0)]),
+        Polygon3D([(2, 1, 0), (2, 0, 0), (3, 0, 0), (3, 1, 0)]),  # no overlap
+        Polygon3D(reversed([(0, 1, 0), (0, 0, 0), (1, 0, 0), (1, 1, 0)])),
+        Polygon3D([(0, 1, 1), (0, 0, 1), (1, 0, 1), (1, 1, 1)]),  # other plane
+        Polygon3D([(0.5, 1, 0), (0.5, 0, 0), (2.5, 0, 0), (2.5, 1, 0)]),
+    ]
+    assert SurfaceIndex(polys).candidate_pairs() == [(0, 2), (0, 4), (1, 4), (2, 4)]
+
+
+class MockSurface(object):
+    def __init__(self, coords):
+        self.coords = coords
+
+
+def test_getidfplanes_near_equal():
+    # type: () -> None
+    floor = MockSurface([(0, 1, 2.99999999), (0, 0, 2.99999999), (1, 0, 2.99999999)])
+    other = MockSurface([(0, 1, 3.00000001), (0, 0, 3.00000001), (1, 0, 3.00000001)])
+    ceiling = MockSurface([(1, 0, 3.0), (0, 0, 3.0), (0, 1, 3.0)])
+    planes = getidfplanes([floor, other, ceiling])
+    assert len(planes) == 2
+    for distance in planes:
+        for vector in planes[distance]:
+            assert planes[-distance][-vector]
+    planes = getidfplanes([floor, other, ceiling], tolerance=1e-9)
+    assert len(planes) == 3
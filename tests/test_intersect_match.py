@@ -1,21 +1,44 @@
 """Tests for intersecting and matching."""
 
+import functools
 import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any  # noqa
 
 import pytest
 from eppy.iddcurrent import iddcurrent
 from io import StringIO
 
-from geomeppy.geom.surfaces import minimal_set
+from geomeppy.geom.adjacency import AdjacencyGraph
+from geomeppy.geom.surfaces import (
+    minimal_set,
+)
 from geomeppy.idf import IDF
+from geomeppy.geom import intersect_match
 from geomeppy.geom.intersect_match import (
     get_adjacencies,
+    get_plane_buckets,
     intersect_idf_surfaces,
+    intersect_plane_surfaces,
+    is_reversed,
     match_idf_surfaces,
+    vertex_key,
+)
+from geomeppy.geom.polygons import (
+    intersect,
+    is_hole,
+    Polygon3D,
+    PolygonWithHoles,
+    project,
+    project_inv,
+    project_to_2D,
+    project_to_3D,
 )
-from geomeppy.geom.polygons import intersect, is_hole, Polygon3D
 from geomeppy.recipes import translate_coords
-from geomeppy.utilities import almostequal
+from geomeppy.utilities import almostequal, override_tolerances
+
+pytestmark = pytest.mark.usefixtures("clipping_backend")
 
 
 class TestSetCoords:
@@ -76,45 +99,34 @@ class TestSimpleTestPolygons:
     def test_simple_hole(self):
         # type: () -> None
         """
+        The intersect function should return the hole and the surface with a hole in it.
          _________
         | 1 ___   |
         |  | 2 |  |
         |  |___|  |
         |_________|
 
-         ________
-        |\ ___   |
-        |1| 2 | 4|
-        | |_3_|  |
-        |/_______|
+         _________
+        | 1 ___   |
+        |  |2,3|  |
+        |  |___|  |
+        |_________|
 
         """
         poly1 = Polygon3D([(0, 4, 0), (0, 0, 0), (4, 0, 0), (4, 4, 0)])
         poly2 = Polygon3D([(2, 2, 0), (2, 1, 0), (1, 1, 0), (1, 2, 0)])
         adjacencies = [(poly1, poly2)]
 
-        poly1 = Polygon3D(
-            [(0, 4, 0), (0, 0, 0), (1, 1, 0), (1, 2, 0)]
-        )  # smaller section
-        poly2 = Polygon3D([(1, 2, 0), (1, 1, 0), (2, 1, 0), (2, 2, 0)])  # inverse hole
-        poly3 = Polygon3D([(2, 2, 0), (2, 1, 0), (1, 1, 0), (1, 2, 0)])  # hole
-        poly4 = Polygon3D(
-            [
-                (4, 4, 0),
-                (0, 4, 0),
-                (1, 2, 0),
-                (2, 2, 0),
-                (2, 1, 0),
-                (1, 1, 0),
-                (0, 0, 0),
-                (4, 0, 0),
-            ]
-        )  # larger section
+        inverse_hole = Polygon3D([(1, 2, 0), (1, 1, 0), (2, 1, 0), (2, 2, 0)])
         result = intersect(*adjacencies[0])
-        expected = [poly1, poly2, poly3, poly4]
-        assert len(result) == len(expected)
-        for poly in expected:
-            assert poly in result
+        assert len(result) == 3
+        assert inverse_hole in result
+        assert poly2 in result
+        with_holes = [p for p in result if isinstance(p, PolygonWithHoles)]
+        assert len(with_holes) == 1
+        assert with_holes[0].exterior == poly1
+        # the hole runs the same way as the exterior
+        assert with_holes[0].holes == [inverse_hole]
 
     def test_three_overlapping(self):
         # type: () -> None
@@ -262,6 +274,48 @@ class TestMatchSurfaces:
             assert f.Outside_Boundary_Condition == "ground"
             assert f.Outside_Boundary_Condition_Object == ""
 
+    @pytest.mark.parametrize("fallback", [True, False])
+    def test_match_near_miss(self, new_idf, fallback):
+        # type: (IDF, bool) -> None
+        """Vertices which are equal within tolerance but round to different keys."""
+        idf = new_idf
+        floor = idf.newidfobject(
+            "BUILDINGSURFACE:DETAILED", Name="floor", Surface_Type="floor"
+        )
+        floor.setcoords([(0, 0, 1), (0, 1, 1), (1.00000004, 1, 1), (1.00000004, 0, 1)])
+        ceiling = idf.newidfobject(
+            "BUILDINGSURFACE:DETAILED", Name="ceiling", Surface_Type="ceiling"
+        )
+        ceiling.setcoords(
+            reversed([(0, 0, 1), (0, 1, 1), (1.00000006, 1, 1), (1.00000006, 0, 1)])
+        )
+        assert vertex_key(floor.coords) != vertex_key(list(reversed(ceiling.coords)))
+        if fallback:
+            match_idf_surfaces(idf)  # on by default
+            assert floor.Outside_Boundary_Condition_Object == "ceiling"
+        else:
+            match_idf_surfaces(idf, fallback=False)
+            assert floor.Outside_Boundary_Condition_Object == ""
+
+
+def test_vertex_key():
+    # type: () -> None
+    coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)]
+    for i in range(len(coords)):
+        assert vertex_key(coords[i:] + coords[:i]) == vertex_key(coords)
+    assert vertex_key(coords) != vertex_key(list(reversed(coords)))
+    assert vertex_key([(0, 0, 0.00000001)]) == vertex_key([(0, 0, 0)])
+
+
+def test_is_reversed():
+    # type: () -> None
+    coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)]
+    reversed_coords = list(reversed(coords))
+    for i in range(len(coords)):
+        assert is_reversed(coords, reversed_coords[i:] + reversed_coords[:i])
+    assert not is_reversed(coords, coords)
+    assert not is_reversed(coords, reversed_coords[:3])
+
 
 class TestAdjacencies:
     def test_get_adjacencies(self, base_idf):
@@ -272,6 +326,46 @@ class TestAdjacencies:
         assert ("BuildingSurface:Detailed", "z2_WALL_0004") in adjacencies
         assert len(adjacencies) == 2
 
+    @pytest.mark.parametrize("fixture", ["base_idf", "ring_idf"])
+    def test_indexed_matches_pairwise(self, fixture, request):
+        # type: (str, pytest.FixtureRequest) -> None
+        idf = request.getfixturevalue(fixture)
+        surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
+        indexed = get_adjacencies(surfaces)
+        pairwise = get_adjacencies(surfaces, indexed=False)
+        assert list(indexed) == list(pairwise)
+        for key in pairwise:
+            assert [p.vertices_list for p in indexed[key]] == [
+                p.vertices_list for p in pairwise[key]
+            ]
+
+
+def test_project_points():
+    # type: () -> None
+    poly = Polygon3D([(0, 0, 1), (2, 0, 2), (2, 3, 2), (0, 3, 1)])
+    axis = poly.projection_axis
+    points_2d = project_to_2D(poly.points_matrix, axis)
+    assert points_2d.shape == (4, 2)
+    assert [tuple(p) for p in points_2d] == [project(p, axis) for p in poly]
+    points_3d = project_to_3D(points_2d, axis, poly.distance, poly.normal_vector)
+    assert points_3d.shape == (4, 3)
+    expected = [
+        project_inv(p, axis, poly.distance, poly.normal_vector) for p in points_2d
+    ]
+    assert [tuple(p) for p in points_3d] == expected
+    assert almostequal(points_3d, poly.points_matrix)
+
+
+def test_minimal_set_tilted():
+    # type: () -> None
+    poly1 = Polygon3D([(0, 0, 1), (2, 0, 2), (2, 3, 2), (0, 3, 1)])
+    poly2 = Polygon3D([(0, 0, 1), (0, 3, 1), (1, 3, 1.5), (1, 0, 1.5)])
+    result = minimal_set([poly1, poly2])
+    assert len(result) == 2
+    assert almostequal(sum(p.area for p in result), poly1.area)
+    for p in result:
+        assert almostequal(p.normal_vector, poly1.normal_vector)
+
 
 def test_intersect():
     # type: () -> None
@@ -399,6 +493,234 @@ class TestIntersectMatch:
             obj = idf.getobject("BUILDINGSURFACE:DETAILED", name)
             assert obj
 
+    def test_intersect_workers(self, base_idf, ring_idf):
+        # type: (IDF, IDF) -> None
+        for idf_txt in [base_idf.idfstr(), ring_idf.idfstr()]:
+            serial = IDF(StringIO(idf_txt))
+            parallel = IDF(StringIO(idf_txt))
+            serial.intersect_match()
+            parallel.intersect_match(workers=2)
+            assert [s.obj for s in serial.getsurfaces()] == [
+                s.obj for s in parallel.getsurfaces()
+            ]
+
+    def test_intersect_spawned_workers(self, ring_idf, monkeypatch):
+        # type: (IDF, Any) -> None
+        # spawned workers don't inherit the tolerances or backend of the main process
+        spawn = multiprocessing.get_context("spawn")
+        monkeypatch.setattr(
+            intersect_match,
+            "ProcessPoolExecutor",
+            functools.partial(ProcessPoolExecutor, mp_context=spawn),
+        )
+        results = []
+        for workers in [None, 2]:
+            idf = IDF(StringIO(ring_idf.idfstr()))
+            floor = idf.getobject("BUILDINGSURFACE:DETAILED", "z2 Floor 0001")
+            floor.setcoords(translate_coords(Polygon3D(floor.coords), [0, 0, 0.001]))
+            with override_tolerances(places=2, adjacency=2, plane=1e-2):
+                idf.intersect(workers=workers)
+            results.append([s.obj for s in idf.getsurfaces()])
+        assert len(results[0]) == 14
+        assert results[0] == results[1]
+
+    def test_intersect_45_degree_walls(self, new_idf):
+        # type: (IDF) -> None
+        # the normals of these walls differ in the last bit, so they have different projection axes
+        idf = new_idf
+        x, y = -35.6, 44.9
+        a = [(x, y), (x + 10, y + 10), (x, y + 20), (x - 10, y + 10)]
+        b = [(x + 5, y + 5), (x + 15, y - 5), (x + 25, y + 5), (x + 15, y + 15)]
+        idf.add_block("a", a, 3)
+        idf.add_block("b", b, 3)
+        idf.intersect_match()
+        shared = Polygon3D(
+            [
+                (x + 10, y + 10, 3),
+                (x + 10, y + 10, 0),
+                (x + 5, y + 5, 0),
+                (x + 5, y + 5, 3),
+            ]
+        )
+        expected = {
+            "Block a Storey 0 Wall 0001_1": shared.invert_orientation(),
+            "Block a Storey 0 Wall 0001_2": Polygon3D(
+                [(x, y, 3), (x, y, 0), (x + 5, y + 5, 0), (x + 5, y + 5, 3)]
+            ),
+            "Block b Storey 0 Wall 0004_1": shared,
+            "Block b Storey 0 Wall 0004_2": Polygon3D(
+                [
+                    (x + 15, y + 15, 3),
+                    (x + 15, y + 15, 0),
+                    (x + 10, y + 10, 0),
+                    (x + 10, y + 10, 3),
+                ]
+            ),
+        }
+        for name, poly in expected.items():
+            wall = idf.getobject("BUILDINGSURFACE:DETAILED", name)
+            assert Polygon3D(wall.coords) == poly
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "Block a Storey 0 Wall 0001_1")
+        assert wall.Outside_Boundary_Condition_Object == "Block b Storey 0 Wall 0004_1"
+
+    def test_dirty_surfaces(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        assert idf.dirty_surfaces == []
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "z1_WALL_0001")
+        wall.setcoords(translate_coords(Polygon3D(wall.coords), [0, 0, 1]))
+        assert idf.dirty_surfaces == [wall]
+        idf.intersect_match()
+        assert idf.dirty_surfaces == []
+
+    def test_adjacency_graph(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        assert idf.adjacency_graph().zones == {}
+        idf.intersect_match()
+        graph = idf.adjacency_graph()
+        assert graph is idf.adjacency_graph()  # cached
+        assert graph.neighbours("z1 Thermal Zone") == ["z2 Thermal Zone"]
+        shared = graph.zones["z1 Thermal Zone"]["z2 Thermal Zone"]
+        assert almostequal(shared, 0.5 * (0.5**2 + 0.05**2) ** 0.5)
+        assert graph.zones["z2 Thermal Zone"]["z1 Thermal Zone"] == shared
+        assert graph.surfaces["z1_WALL_0002_1"] == {"z2_WALL_0004_1": shared}
+        # the same graph can be built from the boundary conditions
+        scanned = AdjacencyGraph.from_surfaces(idf.getsurfaces())
+        assert scanned.surfaces == graph.surfaces
+        assert scanned.zones == graph.zones
+        # moving a surface invalidates the cached graph
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "z1_WALL_0001")
+        wall.setcoords(translate_coords(Polygon3D(wall.coords), [0, 0, 1]))
+        assert idf.adjacency_graph() is not graph
+
+    @pytest.mark.parametrize("fixture", ["base_idf", "ring_idf"])
+    def test_intersect_match_plan_only(self, fixture, request):
+        # type: (str, pytest.FixtureRequest) -> None
+        idf = request.getfixturevalue(fixture)
+        expected = IDF(StringIO(idf.idfstr()))
+        expected.intersect_match()
+        before = idf.idfstr()
+        plan = idf.intersect_match(plan_only=True)
+        assert idf.idfstr() == before
+        assert plan.splits
+        assert plan.boundary_conditions
+        plan.apply(idf)
+        assert len(idf.getsurfaces()) == len(expected.getsurfaces())
+        assert idf.adjacency_graph().zones == expected.adjacency_graph().zones
+        assert idf.adjacency_graph().surfaces == expected.adjacency_graph().surfaces
+
+    def test_plan_only_up_to_date(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        idf.intersect_match()
+        assert len(idf.intersect_match(plan_only=True)) == 0
+
+    def test_match_plan_only(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        plan = match_idf_surfaces(idf, plan_only=True)
+        assert not plan.splits
+        floor = ("BUILDINGSURFACE:DETAILED", "z1_FLOOR")
+        assert (
+            plan.boundary_conditions[floor]["View_Factor_to_Ground"] == "autocalculate"
+        )
+        assert idf.getobject(*floor).View_Factor_to_Ground == ""
+        plan.apply(idf)
+        assert idf.getobject(*floor).View_Factor_to_Ground == "autocalculate"
+
+    def test_replace_surfaces(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        n_surfaces = len(idf.getsurfaces())
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "z1_WALL_0002")
+        halves = [
+            [(1.0, 2.1, 0.5), (1.0, 2.1, 0.0), (1.5, 2.05, 0.0), (1.5, 2.05, 0.5)],
+            [(1.5, 2.05, 0.5), (1.5, 2.05, 0.0), (2.0, 2.0, 0.0), (2.0, 2.0, 0.5)],
+        ]
+        idf.replace_surfaces({("BUILDINGSURFACE:DETAILED", "z1_WALL_0002"): halves})
+        surfaces = idf.getsurfaces()
+        assert len(surfaces) == n_surfaces + 1
+        assert wall not in surfaces
+        assert [s.Name for s in surfaces[-2:]] == ["z1_WALL_0002_1", "z1_WALL_0002_2"]
+        for s, coords in zip(surfaces[-2:], halves):
+            assert s.coords == coords
+            assert s.Zone_Name == wall.Zone_Name
+            assert s.theidf is idf
+        # the model data is kept in sync with the bunches
+        assert [s.obj for s in surfaces] == idf.model.dt["BUILDINGSURFACE:DETAILED"]
+        assert "z1_WALL_0002_2" in idf.idfstr()
+
+    def test_intersect_match_incremental(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        idf.intersect_match()
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "z1_WALL_0001")
+        wall.Outside_Boundary_Condition = "adiabatic"
+        # move zone 2 away from zone 1
+        for s in idf.getsurfaces() + idf.getshadingsurfaces():
+            if s.Name.startswith("z2"):
+                s.setcoords(translate_coords(Polygon3D(s.coords), [10, 0, 0]))
+        idf.intersect_match(incremental=True)
+        # the walls which were matched to zone 2 are now external
+        for s in idf.getsurfaces("wall"):
+            if s.Name.startswith("z1_WALL_0002"):
+                assert s.Outside_Boundary_Condition == "outdoors"
+        # surfaces in planes with no changes are left alone
+        assert wall.Outside_Boundary_Condition == "adiabatic"
+        assert idf.dirty_surfaces == []
+
+    def test_intersect_match_incremental_renamed(self, new_idf):
+        # type: (IDF) -> None
+        idf = new_idf
+        idf.add_block("a", [(0, 0), (10, 0), (10, 10), (0, 10)], 3)
+        idf.add_block("b", [(10, 0), (20, 0), (20, 10), (10, 10)], 3)
+        idf.add_block("c", [(15, 5), (25, 5), (25, 15), (15, 15)], 3)
+        idf.intersect_match()
+        # move block b next to block c, so its split walls are intersected again and renamed
+        for s in idf.getsurfaces():
+            if s.Name.startswith("Block b"):
+                s.setcoords(translate_coords(Polygon3D(s.coords), [15, 0, 0]))
+        idf.intersect_match(incremental=True)
+        names = {s.Name for s in idf.getsurfaces()}
+        matched = {
+            s.Name: s.Outside_Boundary_Condition_Object
+            for s in idf.getsurfaces()
+            if s.Outside_Boundary_Condition == "surface"
+        }
+        assert all(other in names for other in matched.values())
+        assert matched == {
+            "Block b Storey 0 Wall 0004_1_1": "Block c Storey 0 Wall 0002_1",
+            "Block c Storey 0 Wall 0002_1": "Block b Storey 0 Wall 0004_1_1",
+        }
+        wall = idf.getobject("BUILDINGSURFACE:DETAILED", "Block a Storey 0 Wall 0002_1")
+        assert wall.Outside_Boundary_Condition == "outdoors"
+
+    def test_get_plane_buckets(self, base_idf):
+        # type: (IDF) -> None
+        surfaces = base_idf.getsurfaces() + base_idf.getshadingsurfaces()
+        buckets = get_plane_buckets(surfaces)
+        assert sorted(s.Name for b in buckets for s in b) == sorted(
+            s.Name for s in surfaces
+        )
+        # z1 roof and z2 floor face opposite ways in the same plane
+        roof_bucket = [b for b in buckets if "z1_ROOF" in [s.Name for s in b]][0]
+        assert [s.Name for s in roof_bucket] == ["z1_ROOF", "z2_ROOF"]
+        wall_bucket = [b for b in buckets if "z1_WALL_0002" in [s.Name for s in b]][0]
+        assert [s.Name for s in wall_bucket] == ["z1_WALL_0002", "z2_WALL_0004"]
+
+    def test_intersect_plane_surfaces(self, base_idf):
+        # type: (IDF) -> None
+        idf = base_idf
+        surfaces = idf.getsurfaces() + idf.getshadingsurfaces()
+        buckets = get_plane_buckets(surfaces)
+        wall_bucket = [b for b in buckets if "z1_WALL_0002" in [s.Name for s in b]][0]
+        intersect_plane_surfaces(idf, wall_bucket)
+        names = [s.Name for s in idf.getsurfaces()]
+        assert len(names) == 14
+        assert "z1_WALL_0002" not in names
+        assert "z1_WALL_0002_1" in names
+
 
 @pytest.mark.xfail("sys.version_info.major == 3 and sys.version_info.minor == 5")
 def test_real_scale():
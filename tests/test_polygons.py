@@ -1,15 +1,30 @@
 """Tests for polygons."""
 
+import itertools
+
+from eppy.geometry.surface import area
+import numpy as np
+import pytest
+
+from geomeppy.geom.batch import PolygonBatch
 from geomeppy.geom.polygons import (
     break_polygons,
+    intersect,
+    PlaneFrame,
     Polygon2D,
     Polygon3D,
+    polygon_area,
+    PolygonWithHoles,
+    share_frames,
     Vector2D,
     Vector3D,
 )
 from geomeppy.geom.segments import Segment
+from geomeppy.geom.vectors import nearest_pairs, squared_distances
 from geomeppy.utilities import almostequal
 
+pytestmark = pytest.mark.usefixtures("clipping_backend")
+
 
 def test_polygon_repr():
     # type: () -> None
@@ -49,6 +64,62 @@ def test_polygon_index():
     assert poly.index(Vector3D(0, 0, 0)) == 1
 
 
+def test_polygon_storage():
+    # type: () -> None
+    poly = Polygon3D([(0, 4), (0, 0, 0), (4, 0, 0), (4, 4, 0)])
+    matrix = poly.points_matrix
+    assert matrix.shape == (4, 3)
+    assert np.shares_memory(matrix, poly.points_matrix)  # no copy
+    assert not matrix.flags.writeable
+    assert poly[0] == Vector3D(0, 4, 0)
+    assert poly[-1] == Vector3D(4, 4, 0)
+    assert poly[1:3] == [Vector3D(0, 0, 0), Vector3D(4, 0, 0)]
+    poly[0] = Vector3D(0, 5, 0)
+    assert poly.ys == [5, 0, 0, 4]
+    poly.insert(1, (0, 3, 0))
+    assert len(poly) == 5
+    assert poly[1] == Vector3D(0, 3, 0)
+    del poly[1]
+    assert poly.vertices_list == [(0, 5, 0), (0, 0, 0), (4, 0, 0), (4, 4, 0)]
+    poly[1:3] = [(0, 1, 0)]
+    assert poly.vertices_list == [(0, 5, 0), (0, 1, 0), (4, 4, 0)]
+    poly.insert(-1, (2, 2, 0))
+    assert poly.vertices_list == [(0, 5, 0), (0, 1, 0), (2, 2, 0), (4, 4, 0)]
+    # 2D polygons keep all the values they were created with
+    poly2d = Polygon2D([(0, 0, 1), (0, 1, 1), (1, 1, 1)])
+    assert len(poly2d[0]) == 3
+    assert poly2d.points_matrix.shape == (3, 2)
+    assert poly2d.zs == [0, 0, 0]
+    poly2d = Polygon2D([(0, 0), (0, 1), (1, 1)])
+    poly2d.append((1, 0, 1))
+    assert len(poly2d[3]) == 3
+    assert len(poly2d[0]) == 3
+
+
+def test_polygon_cache():
+    # type: () -> None
+    poly = Polygon3D([(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)])
+    assert poly.normal_vector == Vector3D(0, 0, 1)
+    assert poly.distance == 1
+    assert poly.area == 1
+    # returned values can be changed without changing the cache
+    poly.normal_vector.set_length(2)
+    poly.bounding_box[0] = Vector3D(5, 5, 5)
+    assert poly.normal_vector == Vector3D(0, 0, 1)
+    assert Vector3D(5, 5, 5) not in poly.bounding_box
+    # changing the vertices clears the cache
+    poly[2] = Vector3D(2, 2, 1)
+    assert poly.area == 2
+    poly.insert(0, Vector3D(0, 0, 1))
+    del poly[0]
+    del poly[2]
+    assert poly.area == 0.5
+    poly.vertices = [(0, 0, 2), (0, 1, 2), (1, 1, 2), (1, 0, 2)]
+    assert poly.normal_vector == Vector3D(0, 0, -1)
+    assert poly.distance == -2
+    assert poly.projection_axis == 2
+
+
 def test_polygon_attributes():
     # type: () -> None
     poly2d = Polygon2D([(0, 0), (0, 1), (1, 1), (1, 0)])
@@ -343,6 +414,66 @@ def test_intersect_3D_polys_single():
         assert res == exp
 
 
+def test_overlay_3D_polys():
+    # type: () -> None
+    s1 = Polygon3D([(0, 2, 0), (2, 2, 0), (2, 0, 0), (0, 0, 0)])  # clockwise
+    s2 = Polygon3D([(1, 0, 0), (3, 0, 0), (3, 2, 0), (1, 2, 0)])  # anticlockwise
+    overlay = s1.overlay(s2)
+    assert overlay.intersection == s1.intersect(s2)
+    assert overlay.reverse_intersection == s2.intersect(s1)
+    assert overlay.difference == s1.difference(s2)
+    assert overlay.reverse_difference == s2.difference(s1)
+    assert overlay.intersection[0].normal_vector == s1.normal_vector
+    assert overlay.reverse_intersection[0].normal_vector == s2.normal_vector
+    assert len(intersect(s1, s2, overlay)) == 4
+    offset = Polygon3D([(0, 2, 1), (2, 2, 1), (2, 0, 1), (0, 0, 1)])
+    not_coplanar = s1.overlay(offset)
+    assert not_coplanar.intersection == []
+    assert not_coplanar.reverse_difference == []
+
+
+def test_intersect_many_3D_polys():
+    # type: () -> None
+    plate = Polygon3D([(0, 2, 0), (0, 0, 0), (4, 0, 0), (4, 2, 0)])
+    zones = [
+        Polygon3D([(0, 2, 0), (0, 0, 0), (1, 0, 0), (1, 2, 0)]),
+        Polygon3D([(9, 2, 0), (9, 0, 0), (10, 0, 0), (10, 2, 0)]),  # too far away
+        Polygon3D([(0, 2, 1), (0, 0, 1), (1, 0, 1), (1, 2, 1)]),  # not coplanar
+        Polygon3D([(2, 1.5, 0), (2, 0.5, 0), (3, 0.5, 0), (3, 1.5, 0)]),
+    ]
+    result = plate.intersect_many(zones)
+    assert [i for i, _poly in result] == [0, 3]
+    for i, poly in result:
+        assert [poly] == plate.intersect(zones[i])
+    differences = plate.difference_many(zones)
+    assert len(differences) == 1
+    assert isinstance(differences[0], PolygonWithHoles)
+    assert differences[0].holes == [zones[3]]
+    assert almostequal(differences[0].area, plate.area - 3)
+    assert plate.difference_many([]) == [plate]
+
+
+def test_plane_frame():
+    # type: () -> None
+    s1 = Polygon3D([(0, 2, 1), (0, 0, 1), (2, 0, 1), (2, 2, 1)])
+    s2 = Polygon3D([(1, 2, 1), (3, 2, 1), (3, 0, 1), (1, 0, 1)])  # facing the other way
+    s3 = Polygon3D([(0, 2, 2), (0, 0, 2), (2, 0, 2), (2, 2, 2)])
+    frame = PlaneFrame.from_polygon(s1)
+    assert frame.projection_axis == 2
+    assert frame.basis == [0, 1]
+    points = frame.project_to_2D(s1)
+    assert points.tolist() == [[0, 2], [0, 0], [2, 0], [2, 2]]
+    assert frame.project_to_2D(s1) is points  # computed once
+    assert not points.flags.writeable
+    assert frame.project_to_3D(points).tolist() == s1.points_matrix.tolist()
+    share_frames([s1, s2, s3])
+    assert s1.frame is s2.frame
+    assert s1.frame is not s3.frame
+    assert s2.intersect(s1) == [Polygon3D([(1, 2, 1), (2, 2, 1), (2, 0, 1), (1, 0, 1)])]
+    s1.vertices = [(0, 2, 1), (0, 0, 1), (1, 0, 1), (1, 2, 1)]
+    assert s1.frame is not s2.frame
+
+
 def test_difference_3D_polys_single():
     # type: () -> None
     """Simplest test for difference_3D_polys
@@ -632,6 +763,30 @@ def test_break_polygons():
     assert result[1] == expected[1]
 
 
+def test_polygon_with_holes():
+    # type: () -> None
+    poly = Polygon3D([(0, 4, 0), (0, 0, 0), (4, 0, 0), (4, 4, 0)])
+    hole = Polygon3D([(1, 3, 0), (1.5, 2, 0), (1, 1, 0), (3, 1, 0), (3, 3, 0)])
+    overlay = poly.overlay(hole)
+    assert overlay.reverse_difference == []
+    result = overlay.difference
+    assert len(result) == 1
+    with_holes = result[0]
+    assert isinstance(with_holes, PolygonWithHoles)
+    assert with_holes.exterior == poly
+    assert with_holes.holes == [hole]
+    assert almostequal(with_holes.area, poly.area - hole.area)
+    assert with_holes.normal_vector == poly.normal_vector
+    assert with_holes.rings == [poly, hole]
+    pieces = with_holes.break_up()
+    assert len(pieces) == 2
+    assert all(p.normal_vector == poly.normal_vector for p in pieces)
+    assert almostequal(sum(p.area for p in pieces), with_holes.area)
+    keyholed = with_holes.keyhole()
+    assert len(keyholed) == len(poly) + len(hole) + 2
+    assert almostequal(keyholed.area, with_holes.area)
+
+
 def test_identify_inner_ring_polygons():
     # type: () -> None
     geom = [
@@ -701,6 +856,106 @@ def test_normalize():
         assert almostequal(i, 0.57735026)
 
 
+def test_polygon_area():
+    # type: () -> None
+    polys = [
+        Polygon3D([(0, 0, 0), (1, 0, 0), (1, 1, 0.5), (0, 1, 0.5)]),
+        Polygon3D([(0, 0, 0), (1, 0, 0), (2, 0, 0), (2, 1, 0), (0, 1, 0)]),
+        Polygon3D([(0, 0, 3), (1e-5, 0, 3), (1e-5, 1e-5, 3), (0, 1e-5, 3)]),
+        Polygon3D([(0, 0, 0), (1, 1, 1), (2, 2, 2)]),
+        Polygon3D([(0, 0, 0), (1, 0, 0), (1, 1e-9, 0), (0, 1e-9, 0)]),
+    ]
+    for poly in polys:
+        assert abs(poly.area - area(poly)) < 1e-9
+    assert polys[3].area == 0
+    assert polys[4].area == 0
+    assert polygon_area([(0, 0), (2, 0), (2, 1)]) == 1
+    assert Polygon3D([(0, 0, 0), (1, 0, 0)]).area == 0
+    batch = PolygonBatch(polys)
+    assert almostequal(batch.areas(), [p.area for p in polys], places=9)
+
+
+def test_polygon_equality():
+    # type: () -> None
+    poly = Polygon3D([(0, 0, 1), (2, 0, 1), (2, 2, 1), (0, 2, 1)])
+    rotated = Polygon3D([(2, 2, 1), (0, 2, 1), (0, 0, 1), (2, 0, 1)])
+    nudged = Polygon3D([(2, 2, 1), (0, 2, 1), (0, 0, 1), (2, 1e-9, 1)])
+    extra_vertex = Polygon3D([(0, 0, 1), (1, 0, 1), (2, 0, 1), (2, 2, 1), (0, 2, 1)])
+    inside = Polygon3D([(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)])
+    assert poly._compare(rotated) is True
+    assert poly._compare(nudged) is True
+    assert poly._compare(inside) is False
+    assert poly._compare(extra_vertex) is None  # needs clipping
+    assert poly == rotated
+    assert poly == nudged
+    assert poly == extra_vertex
+    assert poly != inside
+    assert poly != poly.invert_orientation()
+    assert poly != "not a polygon"
+    assert poly.project_to_2D() == rotated.project_to_2D()
+    assert poly.project_to_2D() != inside.project_to_2D()
+
+
+def test_mixed_polygon_equality():
+    # type: () -> None
+    poly2d = Polygon2D([(0, 0), (1, 0), (1, 1), (0, 1)])
+    poly3d = Polygon3D([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)])
+    larger = Polygon3D([(0, 0, 0), (2, 0, 0), (2, 2, 0), (0, 2, 0)])
+    assert poly2d._compare(larger) is None  # needs clipping
+    assert isinstance(poly2d == larger, bool)
+    assert poly2d == poly3d
+    assert poly3d != poly2d
+    # lists compare their items with the polygon being looked for
+    assert (larger in [poly2d]) == (poly2d == larger)
+    assert poly3d in [poly2d]
+    assert poly2d not in [poly3d]
+
+
+def test_nearest_pairs():
+    # type: () -> None
+    poly = Polygon3D([(0, 0, 0), (4, 0, 0), (4, 4, 0), (0, 4, 0)])
+    hole = Polygon3D([(1, 1, 0), (3, 1, 0), (3, 3, 0), (1, 3, 0)])
+    links = sorted(
+        itertools.product(range(4), range(4)),
+        key=lambda x: poly[x[0]].relative_distance(hole[x[1]]),
+    )
+    assert nearest_pairs(poly, hole, k=None) == links
+    assert nearest_pairs(poly, hole, k=3) == links[:3]  # with ties at the cut-off
+    assert nearest_pairs(poly, hole) == [(0, 0)]
+    assert nearest_pairs([Vector2D(0, 0)], [(1, 1), (0, 1)]) == [(0, 1)]
+    distances = squared_distances(poly, hole)
+    assert distances.shape == (4, 4)
+    assert distances[0, 2] == poly[0].relative_distance(hole[2])
+
+
+def test_vector_arithmetic():
+    # type: () -> None
+    v = Vector3D(1, 2, 3)
+    assert not hasattr(v, "__dict__")
+    assert v.args == [1.0, 2.0, 3.0]
+    assert 2 * v == v * 2 == Vector3D(2, 4, 6)
+    assert v.dot(Vector3D(1, 0, 1)) == 4.0
+    assert isinstance(v.dot(Vector3D(1, 0, 1)), float)
+    cross = Vector3D(1, 0, 0).cross(Vector3D(0, 1, 0))
+    assert isinstance(cross, Vector3D)
+    assert cross == Vector3D(0, 0, 1)
+    assert almostequal(v.length, 14**0.5)
+    v[0] = 5
+    assert v.x == 5.0
+    v.normalize()
+    assert almostequal(v.x, 5 / 38**0.5)
+    v2 = Vector2D(1, 2, 3)
+    assert len(v2) == 3
+    assert v2.z == 0.0
+    assert list(v2) == [1.0, 2.0, 3.0]
+    # setting items through args changes the vector
+    v2.args[1] = 5
+    assert v2.y == 5.0
+    assert list(v2) == [1.0, 5.0, 3.0]
+    v.args[2] += 1
+    assert almostequal(v.z, 3 / 38**0.5 + 1)
+
+
 def test_on_poly_edge():
     # type: () -> None
     poly = Polygon3D([(0, 4, 0), (0, 0, 0), (4, 0, 0), (4, 4, 0)])
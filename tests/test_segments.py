@@ -1,6 +1,9 @@
 """Tests for Segment class, representing a line segment."""
 
-from geomeppy.geom.segments import Segment
+import numpy as np
+
+from geomeppy.geom.polygons import Polygon2D, Polygon3D
+from geomeppy.geom.segments import collinear_edges, Segment
 from geomeppy.geom.vectors import Vector3D
 
 
@@ -41,3 +44,34 @@ def test_collinear():
     edge1 = Segment(Vector3D(0, 0, 0), Vector3D(1, 1, 1))
     edge2 = Segment(Vector3D(1, 0, 0), Vector3D(2, 1, 1))
     assert not edge1._is_collinear(edge2)
+
+
+def test_collinear_edges():
+    # type: () -> None
+    edges = [
+        Segment(Vector3D(0, 0, 0), Vector3D(1, 1, 1)),
+        Segment(Vector3D(1, 1, 1), Vector3D(0, 0, 0)),
+        Segment(Vector3D(0, 0, 0), Vector3D(4, 4, 4)),
+        Segment(Vector3D(1, 4, 0), Vector3D(1, 0, 0)),
+        Segment(Vector3D(1, 0, 0), Vector3D(1, 2, 0)),
+        Segment(Vector3D(1, 0, 0), Vector3D(2, 1, 1)),
+    ]
+    array = np.array([e.as_array() for e in edges])
+    assert array.shape == (6, 2, 3)
+    result = collinear_edges(array, array)
+    assert result.shape == (6, 6)
+    for i, edge in enumerate(edges):
+        for j, other in enumerate(edges):
+            assert result[i, j] == edge._is_collinear(other)
+
+
+def test_edges_array():
+    # type: () -> None
+    poly = Polygon3D([(0, 0, 1), (2, 0, 1), (2, 2, 1)])
+    expected = [[[0, 0, 1], [2, 0, 1]], [[2, 0, 1], [2, 2, 1]], [[2, 2, 1], [0, 0, 1]]]
+    assert poly.edges_array.tolist() == expected
+    assert [e.as_array().tolist() for e in poly.edges] == expected
+    poly2d = Polygon2D([(0, 0), (2, 0), (2, 2)])
+    assert poly2d.edges_array[:, :, 2].tolist() == [[0, 0]] * 3
+    assert Segment(Vector3D(1, 0, 0), Vector3D(3, 0, 0))._on_poly_edge(poly2d)
+    assert not Segment(Vector3D(0, 1, 0), Vector3D(1, 2, 0))._on_poly_edge(poly2d)
@@ -0,0 +1,39 @@
+"""Tests for utilities."""
+
+import numpy as np
+import pytest
+
+from geomeppy.geom.intersect_match import is_reversed
+from geomeppy.geom.vectors import Vector3D
+from geomeppy.utilities import almostequal, override_tolerances, tolerances
+
+
+def test_almostequal():
+    # type: () -> None
+    assert almostequal(1.0, 1.00000001)
+    assert not almostequal(1.0, 1.000001)
+    assert almostequal(1.0, 1.000001, places=5)
+    assert almostequal(np.float64(2), 2)
+    assert almostequal(Vector3D(0, 0, -1), (0, 0, -1.00000001))
+    assert not almostequal(Vector3D(0, 0, -1), (0, 0, 1))
+    assert almostequal(np.array([[0, 1], [2, 3]]), [[0, 1], [2, 3.00000001]])
+    assert not almostequal(np.array([[0, 1], [2, 3]]), [[0, 1], [2, 3.1]])
+    assert almostequal("1.0", 1)
+    assert almostequal("abc", "abc")
+    assert not almostequal("abc", "abd")
+
+
+def test_override_tolerances():
+    # type: () -> None
+    coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0)]
+    nudged = [(1, 1, 0), (1, 0, 0), (0, 0.00001, 0)]
+    assert not is_reversed(coords, nudged)
+    with override_tolerances(places=4) as overridden:
+        assert overridden.places == 4
+        assert almostequal(1.0, 1.00001)
+        assert is_reversed(coords, nudged)
+    assert tolerances.places == 7
+    assert not almostequal(1.0, 1.00001)
+    with pytest.raises(AttributeError):
+        with override_tolerances(nonsense=1):
+            pass